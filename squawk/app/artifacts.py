@@ -0,0 +1,309 @@
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Optional
+
+from squawk.exceptions import ArtifactStoreLockedError
+from squawk.settings import SettingsManager
+from squawk.utils import core
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+KINDS = ["render", "pcm", "mel", "segments", "srt", "manifest"]
+
+# Seconds to wait for another squawk process to release the index
+LOCK_TIMEOUT = 10.0
+
+# A lock older than this was left by a process that died holding it
+STALE_LOCK_AGE = 60.0
+
+# Artifacts used more recently than this are never evicted,
+# since another squawk process may be about to read them
+EVICTION_GRACE = 600.0
+
+
+class ArtifactStore:
+    """
+    Index of the files squawk writes into its working directory.
+
+    Records what each file is, what produced it and when it was last used,
+    so old files can be evicted once the store outgrows its quotas.
+    Only files registered here are ever deleted.
+
+    The index is shared by every squawk process using the same working
+    directory. All changes happen under a lock file, and recently used
+    files are never evicted, so concurrent runs can't delete each other's work.
+    """
+
+    def __init__(self, root: str, max_size_mb: int = 0, max_age_days: int = 0):
+        """
+        Args:
+            root (str): Working directory artifacts are written to
+            max_size_mb (int): Total size to evict down to. 0 for no limit
+            max_age_days (int): Days unused before eviction. 0 for no limit
+        """
+
+        self.root = os.path.abspath(root)
+        self.max_size = max_size_mb * 1024 * 1024
+        self.max_age = max_age_days * 24 * 3600
+
+        self.index_file = os.path.join(self.root, ".squawk_cache", "artifacts.json")
+        self.lock_file = self.index_file + ".lock"
+
+    def _break_stale_lock(self):
+        """
+        Remove a lock left by a dead process, without racing other processes doing the same.
+
+        The lock is renamed to a name only this process uses before it's removed,
+        so if several processes find it stale at once, only one of them gets it.
+        The rest fail the rename and go back to waiting. If a live process
+        took the lock between the staleness check and the rename, it's put back.
+        """
+
+        stale_file = f"{self.lock_file}.{os.getpid()}.{uuid.uuid4().hex}.stale"
+
+        try:
+            os.rename(self.lock_file, stale_file)
+        except OSError:
+            return
+
+        try:
+            if time.time() - os.path.getmtime(stale_file) > STALE_LOCK_AGE:
+                logger.debug("[magenta]Removed stale artifact index lock")
+            else:
+                # Fails if yet another process has locked it since, that lock stands
+                os.link(stale_file, self.lock_file)
+        except OSError:
+            pass
+        finally:
+            os.remove(stale_file)
+
+    @contextmanager
+    def _locked(self):
+
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        deadline = time.monotonic() + LOCK_TIMEOUT
+
+        while True:
+
+            try:
+                fd = os.open(self.lock_file, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+
+            except FileExistsError:
+
+                try:
+                    if time.time() - os.path.getmtime(self.lock_file) > STALE_LOCK_AGE:
+                        self._break_stale_lock()
+                        continue
+                except OSError:
+                    continue
+
+                if time.monotonic() > deadline:
+                    raise ArtifactStoreLockedError(self.lock_file)
+
+                time.sleep(0.05)
+
+        try:
+            yield
+        finally:
+            os.close(fd)
+            os.remove(self.lock_file)
+
+    def _read_index(self) -> dict:
+
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as file:
+                index = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return dict()
+
+        # Drop files removed by hand or by the segment cache's own eviction
+        return {k: v for k, v in index.items() if os.path.exists(self._abspath(k))}
+
+    def _write_index(self, index: dict):
+
+        with core.atomic_write(self.index_file) as file:
+            json.dump(index, file, indent=1)
+
+    def _relpath(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root)
+
+    def _abspath(self, relpath: str) -> str:
+        return os.path.join(self.root, relpath)
+
+    def register(self, path: str, kind: str, source: Optional[str] = None):
+        """
+        Add or update an artifact, then evict old ones if over quota.
+
+        Never raises, a failure to track a file shouldn't fail the job.
+
+        Args:
+            path (str): Path of the file, inside the working directory
+            kind (str): One of `KINDS`
+            source (str, optional): What it was produced from, e.g. a timeline name
+        """
+
+        assert kind in KINDS
+
+        try:
+
+            with self._locked():
+
+                index = self._read_index()
+                relpath = self._relpath(path)
+                now = time.time()
+
+                index[relpath] = {
+                    "kind": kind,
+                    "source": source,
+                    "size": os.path.getsize(path),
+                    "created": index.get(relpath, {}).get("created", now),
+                    "last_used": now,
+                }
+
+                self._evict(index)
+                self._write_index(index)
+
+        except (OSError, ValueError, ArtifactStoreLockedError) as e:
+            logger.warning(f"[yellow]Couldn't register artifact '{path}': {e}")
+
+    def touch(self, path: str):
+        """Mark an artifact as used, so it's evicted last"""
+
+        try:
+
+            with self._locked():
+
+                index = self._read_index()
+                entry = index.get(self._relpath(path))
+
+                if entry:
+                    entry["last_used"] = time.time()
+                    self._write_index(index)
+
+        except (OSError, ValueError, ArtifactStoreLockedError) as e:
+            logger.debug(f"Couldn't update artifact '{path}': {e}")
+
+    def entries(self) -> dict:
+        """
+        Returns:
+            dict: Index entries keyed by path relative to the working directory
+        """
+
+        with self._locked():
+            return self._read_index()
+
+    def _evict(
+        self,
+        index: dict,
+        max_size: Optional[int] = None,
+        max_age: Optional[float] = None,
+        grace: float = EVICTION_GRACE,
+        dry_run: bool = False,
+    ) -> list:
+        """
+        Evict least recently used artifacts from index until within quotas.
+
+        Quotas not given fall back to the store's, where 0 means no limit.
+        Quotas given are applied as is, so 0 evicts everything outside the grace period.
+        """
+
+        if max_size is None:
+            max_size = self.max_size or None
+        if max_age is None:
+            max_age = self.max_age or None
+
+        now = time.time()
+        total_size = sum(x["size"] for x in index.values())
+        evicted = []
+
+        for relpath, entry in sorted(index.items(), key=lambda x: x[1]["last_used"]):
+
+            unused_for = now - entry["last_used"]
+            over_size = max_size is not None and total_size > max_size
+            too_old = max_age is not None and unused_for > max_age
+
+            if unused_for < grace:
+                break
+
+            if not over_size and not too_old:
+                continue
+
+            if not dry_run:
+
+                try:
+                    os.remove(self._abspath(relpath))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    # Open in another process on Windows, try again next time
+                    logger.debug(f"Couldn't evict '{relpath}': {e}")
+                    continue
+
+                del index[relpath]
+
+            total_size -= entry["size"]
+            evicted.append(relpath)
+            logger.debug(f"[magenta]Evicted {entry['kind']} '{relpath}'")
+
+        return evicted
+
+    def prune(
+        self,
+        max_size_mb: Optional[int] = None,
+        max_age_days: Optional[float] = None,
+        everything: bool = False,
+        dry_run: bool = False,
+    ) -> list:
+        """
+        Evict artifacts now, optionally with tighter quotas than configured.
+
+        Args:
+            max_size_mb (int, optional): Size to evict down to. 0 evicts everything
+            max_age_days (float, optional): Evict artifacts unused for longer
+            everything (bool): Evict all artifacts not currently in use
+            dry_run (bool): Only report what would be evicted
+
+        Returns:
+            list: Paths evicted, relative to the working directory
+        """
+
+        max_size = None if max_size_mb is None else max_size_mb * 1024 * 1024
+        max_age = None if max_age_days is None else max_age_days * 24 * 3600
+
+        if everything:
+            max_age = 0
+
+        with self._locked():
+
+            index = self._read_index()
+            evicted = self._evict(index, max_size, max_age, dry_run=dry_run)
+
+            if not dry_run:
+                self._write_index(index)
+
+        return evicted
+
+
+def get_store() -> ArtifactStore:
+    """Return the artifact store for the configured working directory"""
+
+    return ArtifactStore(
+        root=settings["paths"]["working_dir"],
+        max_size_mb=settings["artifacts"]["max_size_mb"],
+        max_age_days=settings["artifacts"]["max_age_days"],
+    )
+
+
+def register(path: str, kind: str, source: Optional[str] = None):
+    get_store().register(path, kind, source)
+
+
+def touch(path: str):
+    get_store().touch(path)
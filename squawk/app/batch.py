@@ -0,0 +1,315 @@
+import fnmatch
+import glob
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rich.console import Console
+from rich.progress import Progress
+from squawk.app import artifacts, main, render, session
+from squawk.settings import SettingsManager
+from squawk.utils import audio, core
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+console = Console()
+
+
+def expand_paths(paths: list) -> list:
+    """
+    Expand files, directories and glob patterns into a list of files.
+
+    Directories contribute every file directly inside them.
+    Each file is listed once, in the order first found.
+
+    Args:
+        paths (list): Files, directories or glob patterns
+
+    Returns:
+        list: Paths of existing files
+    """
+
+    media_files = []
+
+    for path in paths:
+
+        if os.path.isdir(path):
+            matches = sorted(os.path.join(path, x) for x in os.listdir(path))
+        else:
+            matches = sorted(glob.glob(path, recursive=True))
+
+        if not matches:
+            logger.warning(f"[yellow]No files found for '{path}'")
+
+        for x in matches:
+            if os.path.isfile(x) and x not in media_files:
+                media_files.append(x)
+
+    return media_files
+
+
+def _srt_path(media_file: str) -> str:
+    """SRT path in the working directory, unique to the media file's folder"""
+
+    # Same named files from different folders, e.g. camera rolls, mustn't collide
+    folder = os.path.dirname(os.path.abspath(media_file))
+    folder_hash = hashlib.sha1(folder.encode("utf-8")).hexdigest()[:8]
+
+    return os.path.join(
+        settings["paths"]["working_dir"],
+        f"{os.path.basename(media_file)}.{folder_hash}.srt",
+    )
+
+
+def _warn_dual_subtitles():
+
+    if settings["text_to_speech"]["dual_subtitles"]:
+        logger.warning(
+            "[yellow]Dual subtitles aren't supported in batches, "
+            "only writing transcriptions"
+        )
+
+
+def transcribe_files(media_files: list) -> list:
+    """
+    Transcribe many media files with one loaded model.
+
+    The next file is decoded in the background while the current one
+    is transcribing. If a transcription server is running, jobs go to it
+    instead of loading the model here.
+
+    A file that fails to decode or transcribe is logged and skipped,
+    so the rest of the batch still finishes. Failures are listed at the end.
+
+    Args:
+        media_files (list): Paths to ffmpeg supported media files
+
+    Returns:
+        list: Paths of the written SRT files, in the same order, without failed files
+    """
+
+    _warn_dual_subtitles()
+
+    # Only waited on once a file misses the cache
+    model_future = main.preload_model()
+
+    core.notify("Squawk", f"Starting transcription of {len(media_files)} files")
+    start_time = time.time()
+
+    srt_files = []
+    failed = []
+    audio_seconds = 0.0
+
+    with ThreadPoolExecutor(max_workers=1) as decoder, Progress() as progress:
+
+        task = progress.add_task("[yellow]Transcribing", total=len(media_files))
+        next_pcm = decoder.submit(main.decode_for_transcription, media_files[0])
+
+        for i, media_file in enumerate(media_files):
+
+            progress.update(task, description=f"[yellow]{os.path.basename(media_file)}")
+
+            decoded = next_pcm
+            if i + 1 < len(media_files):
+                next_pcm = decoder.submit(
+                    main.decode_for_transcription, media_files[i + 1]
+                )
+
+            try:
+
+                pcm = decoded.result()
+                result = main.transcribe_cached(media_file, model=model_future, pcm=pcm)
+
+                if pcm is not None:
+                    audio_seconds += len(pcm) / audio.SAMPLE_RATE
+                elif result["segments"]:
+                    audio_seconds += result["segments"][-1]["end"]
+
+                srt_files.append(
+                    main.write_srt(
+                        result["segments"], _srt_path(media_file), media_file
+                    )
+                )
+
+            except Exception as e:
+                logger.error(f"[red]Couldn't transcribe '{media_file}':[/] {e}")
+                failed.append(media_file)
+
+            progress.advance(task)
+
+    elapsed = max(time.time() - start_time, 0.001)
+    core.notify(
+        "Squawk", f"Transcribed {len(srt_files)} files in {int(elapsed)} seconds"
+    )
+
+    if failed:
+        logger.error(
+            f"[red]{len(failed)} of {len(media_files)} files failed:[/]\n"
+            + "\n".join(failed)
+        )
+
+    console.print(
+        f"\n[bold]Transcribed {len(srt_files)} files[/] "
+        f"({audio_seconds / 60:.1f} minutes of audio) in {elapsed / 60:.1f} minutes\n"
+        f"{len(srt_files) / elapsed * 3600:.1f} files/hour | "
+        f"{audio_seconds / elapsed:.1f}x realtime\n"
+    )
+
+    return srt_files
+
+
+def find_timelines(patterns: list) -> list:
+    """
+    Find timelines in the current project by name or glob pattern.
+
+    Matching is case insensitive. Timelines are returned in project order.
+
+    Args:
+        patterns (list): Timeline names or patterns, e.g. "EP01 *"
+
+    Returns:
+        list: Names of matching timelines
+    """
+
+    return [
+        name
+        for name in session.get_session().timeline_names()
+        if any(fnmatch.fnmatch(name.lower(), x.lower()) for x in patterns)
+    ]
+
+
+def transcribe_timelines(timeline_names: list) -> list:
+    """
+    Render and transcribe several timelines, overlapping the two.
+
+    All renders are queued and started as one Resolve render. Each
+    timeline's audio is transcribed as soon as its render job finishes,
+    while Resolve carries on rendering the rest. Timelines unchanged
+    since they were last rendered reuse that render.
+
+    Args:
+        timeline_names (list): Names of timelines in the current project
+
+    Returns:
+        list: Paths of the written SRT files, in timeline order
+    """
+
+    _warn_dual_subtitles()
+
+    resolve_session = session.get_session()
+    project = resolve_session.project
+    working_dir = settings["paths"]["working_dir"]
+
+    # Job id: (timeline name, output file, timeline fingerprint)
+    jobs = dict()
+    # Timeline name: previously rendered file
+    cached_renders = dict()
+
+    for name in timeline_names:
+
+        resolve_session.open_timeline(name)
+        fingerprint = render.timeline_fingerprint(resolve_session.active_timeline)
+
+        if cached_file := render.find_cached_render(fingerprint):
+            cached_renders[name] = cached_file
+            artifacts.touch(cached_file)
+            logger.info(f"[green]'{name}' unchanged, reusing render '{cached_file}'")
+            continue
+
+        job_id, output_file = main.add_render_job(working_dir)
+        jobs[job_id] = (name, output_file, fingerprint)
+        logger.info(f"[cyan]Queued render of '{name}'")
+
+    # Load the model while Resolve renders the first timeline
+    model_future = main.preload_model()
+
+    def transcribe_render(output_file: str) -> str:
+        result = main.transcribe_cached(output_file, model=model_future)
+        return main.write_srt(result["segments"], _srt_path(output_file), output_file)
+
+    core.notify("Squawk", f"Rendering {len(jobs)} of {len(timeline_names)} timelines")
+    start_time = time.time()
+
+    if jobs and not project.render(list(jobs), interactive=False):
+        logger.error(
+            "[red]Couldn't start render. "
+            "Please make sure the timelines aren't read-only if you're in collaborative mode."
+        )
+        core.app_exit(1, -1)
+
+    srt_futures = dict()
+    watcher = render.RenderWatcher(
+        {x: output_file for x, (_, output_file, _) in jobs.items()}
+    )
+
+    try:
+
+        with ThreadPoolExecutor(max_workers=1) as transcriber, Progress() as progress:
+
+            render_task = progress.add_task("[yellow]Rendering", total=len(jobs))
+            transcribe_task = progress.add_task(
+                "[cyan]Transcribing", total=len(timeline_names)
+            )
+
+            def submit(name: str, media_file: str):
+
+                future = transcriber.submit(transcribe_render, media_file)
+                future.add_done_callback(lambda _: progress.advance(transcribe_task))
+                srt_futures[name] = future
+
+            for name, cached_file in cached_renders.items():
+                submit(name, cached_file)
+
+            def job_finished(job_id: str, job_status: str):
+
+                name, output_file, fingerprint = jobs[job_id]
+                progress.advance(render_task)
+
+                if job_status != "Complete":
+                    logger.error(f"[red]Render of '{name}' {job_status.lower()}")
+                    progress.advance(transcribe_task)
+                    return
+
+                logger.info(f"[green]Rendered '{name}', transcribing")
+                render.save_cached_render(fingerprint, output_file)
+                artifacts.register(output_file, "render", source=name)
+                submit(name, output_file)
+
+            watcher.on_complete(job_finished)
+            watcher.wait()
+
+    except KeyboardInterrupt:
+
+        logger.error("[red]User aborted - stopped render")
+        core.app_exit(1, -1)
+
+    srt_files = []
+    failed = []
+
+    for name in timeline_names:
+
+        if name not in srt_futures:
+            continue
+
+        try:
+            srt_files.append(srt_futures[name].result())
+        except Exception as e:
+            logger.error(f"[red]Couldn't transcribe '{name}': {e}")
+            failed.append(name)
+
+    core.notify(
+        "Squawk",
+        f"Transcribed {len(srt_files)} timelines in {int(time.time() - start_time)} seconds",
+    )
+
+    if failed:
+        logger.error(
+            f"[red]{len(failed)} of {len(timeline_names)} timelines failed:[/]\n"
+            + "\n".join(failed)
+        )
+
+    return srt_files
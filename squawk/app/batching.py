@@ -0,0 +1,184 @@
+import logging
+from dataclasses import fields
+
+import numpy as np
+import torch
+import whisper
+from squawk.app import engines, mel, multitask
+from squawk.settings import SettingsManager
+from squawk.utils import audio
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+BYTES_PER_VALUE = 4
+
+# Decode options `whisper.decode` accepts, `model.transcribe` takes others too
+DECODING_FIELDS = {x.name for x in fields(whisper.DecodingOptions)}
+
+
+def window_memory(dims, beam_size: int = 1) -> int:
+    """
+    Rough peak memory of inference per window in a batch.
+
+    Args:
+        dims (whisper.model.ModelDimensions): Dimensions of the loaded model
+        beam_size (int): Beams decoded per window
+
+    Returns:
+        int: Bytes
+    """
+
+    mel = dims.n_mels * whisper.audio.N_FRAMES
+
+    # Activations of one encoder layer, including its attention weights
+    encoder = dims.n_audio_ctx * dims.n_audio_state * 8
+    encoder += dims.n_audio_head * dims.n_audio_ctx**2
+
+    # Cross and self attention key/value caches of every decoder layer, per beam
+    decoder = (dims.n_audio_ctx + dims.n_text_ctx) * dims.n_text_state
+    decoder *= 2 * dims.n_text_layer * beam_size
+
+    return (mel + encoder + decoder) * BYTES_PER_VALUE
+
+
+def fit_batch_size(dims, batch_size: int, memory_mb: int, beam_size: int = 1) -> int:
+    """
+    Largest batch up to `batch_size` expected to fit in `memory_mb`. Never below 1.
+    """
+
+    per_window = window_memory(dims, beam_size)
+    return max(1, min(batch_size, memory_mb * 1024 * 1024 // per_window))
+
+
+def _needs_fallback(result) -> bool:
+    """Check whether greedy decoding failed the way `model.transcribe` retries"""
+
+    return (
+        result.compression_ratio > multitask.COMPRESSION_RATIO_THRESHOLD
+        or result.avg_logprob < multitask.LOGPROB_THRESHOLD
+    )
+
+
+def transcribe_batched(
+    model,
+    pcm: np.ndarray,
+    decode_options: dict,
+    batch_size: int,
+    memory_mb: int,
+) -> dict:
+    """
+    Transcribe audio as independent windows, decoded several at a time.
+
+    The audio is cut at silences into windows of up to 30 seconds.
+    Their spectrograms are stacked so the encoder and decoder each run once
+    per batch, which keeps CPU matrix kernels far busier than one window at a time.
+
+    Windows aren't prompted with the text before them, since they're decoded
+    together. Any window that fails greedy decoding is redone on its own
+    by `model.transcribe`, with its usual temperature fallback.
+
+    Args:
+        model (whisper.Whisper): Loaded model
+        pcm (np.ndarray): Decoded PCM at `audio.SAMPLE_RATE`
+        decode_options (dict): Keyword arguments as for `model.transcribe`
+        batch_size (int): Most windows decoded at once
+        memory_mb (int): Memory the batch should fit in, lowers `batch_size` if needed
+
+    Returns:
+        dict: Whisper style result
+    """
+
+    options = {k: v for k, v in decode_options.items() if k in DECODING_FIELDS}
+    language = options.get("language")
+    fp16 = model.device.type == "cuda"
+
+    bounds = audio.split_on_silence(pcm, engines.WINDOW_LENGTH, engines.SEARCH_WINDOW)
+    batch_size = fit_batch_size(
+        model.dims, batch_size, memory_mb, options.get("beam_size") or 1
+    )
+
+    logger.debug(f"[magenta]Decoding {len(bounds)} windows in batches of {batch_size}")
+
+    # Computed once per asset and cached, then sliced per window
+    spectrogram = mel.log_spectrogram(pcm, model.dims.n_mels)
+
+    tokenizer = None
+    segments = []
+    redone = 0
+
+    for first in range(0, len(bounds), batch_size):
+
+        batch = bounds[first : first + batch_size]
+
+        mels = torch.stack(
+            [mel.window(spectrogram, start, end) for start, end in batch]
+        )
+        mels = mels.to(model.device)
+        if fp16:
+            mels = mels.half()
+
+        with torch.no_grad():
+
+            features = model.embed_audio(mels)
+
+            if language is None:
+                _, probs = model.detect_language(features[:1])
+                language = max(probs[0], key=probs[0].get)
+                logger.info(f"[cyan]Detected language: {language}")
+
+            results = model.decode(
+                features,
+                whisper.DecodingOptions(
+                    **{
+                        **options,
+                        "language": language,
+                        "temperature": 0.0,
+                        "fp16": fp16,
+                    }
+                ),
+            )
+
+        if tokenizer is None:
+            tokenizer = whisper.tokenizer.get_tokenizer(
+                model.is_multilingual,
+                language=language,
+                task=options.get("task", "transcribe"),
+            )
+
+        for (start, end), result in zip(batch, results):
+
+            offset = start / audio.SAMPLE_RATE
+
+            if (
+                result.no_speech_prob > multitask.NO_SPEECH_THRESHOLD
+                and result.avg_logprob < multitask.LOGPROB_THRESHOLD
+            ):
+                continue
+
+            if not _needs_fallback(result):
+                segments.extend(
+                    multitask.parse_segments(
+                        tokenizer, result, offset, (end - start) / audio.SAMPLE_RATE
+                    )
+                )
+                continue
+
+            redone += 1
+            window_result = model.transcribe(
+                pcm[start:end], **{**decode_options, "language": language}
+            )
+            segments.extend(
+                {**seg, "start": seg["start"] + offset, "end": seg["end"] + offset}
+                for seg in window_result["segments"]
+            )
+
+    if redone:
+        logger.debug(f"[magenta]Redid {redone} windows with temperature fallback")
+
+    return {
+        "text": "".join(seg["text"] for seg in segments),
+        "segments": [{**seg, "id": i} for i, seg in enumerate(segments)],
+        "language": language,
+    }
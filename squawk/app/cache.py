@@ -0,0 +1,157 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Union
+
+from squawk.app import artifacts
+from squawk.settings import SettingsManager
+from squawk.utils import core
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+
+def transcription_settings(model_name: str, decode_options: dict) -> dict:
+    """
+    Settings that change what a transcription comes out as.
+
+    Anything keyed on a transcription, like the segment cache or
+    a timeline's manifest, should compare these to tell if it's stale.
+
+    Args:
+        model_name (str): Whisper model name
+        decode_options (dict): Keyword arguments passed to `model.transcribe`
+
+    Returns:
+        dict: JSON serialisable settings
+    """
+
+    return {
+        "engine": settings["text_to_speech"]["engine"],
+        "model": model_name,
+        "precision": settings["text_to_speech"]["precision"],
+        "translate_to_english": settings["text_to_speech"]["translate_to_english"],
+        "batched": settings["text_to_speech"]["batch_size"] > 1,
+        # Both split the audio into chunks transcribed independently
+        "streaming": settings["text_to_speech"]["streaming"],
+        "parallel_chunk_length": settings["parallel"]["chunk_length"]
+        if settings["parallel"]["enabled"]
+        else None,
+        "vad": dict(settings["vad"]) if settings["vad"]["enabled"] else None,
+        "cascade": dict(settings["cascade"])
+        if settings["cascade"]["enabled"]
+        else None,
+        "decode_options": decode_options,
+    }
+
+
+def make_key(audio_fingerprint: str, model_name: str, decode_options: dict) -> str:
+    """
+    Build a cache key for a transcription.
+
+    Args:
+        audio_fingerprint (str): Hash of the decoded PCM
+        model_name (str): Whisper model name
+        decode_options (dict): Keyword arguments passed to `model.transcribe`
+
+    Returns:
+        str: Hex digest identifying the transcription
+    """
+
+    key_info = {
+        "audio": audio_fingerprint,
+        **transcription_settings(model_name, decode_options),
+    }
+    return hashlib.sha256(
+        json.dumps(key_info, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+class SegmentCache:
+    """
+    Transcription results stored as JSON, one file per key.
+
+    Least recently used entries are evicted once the cache
+    grows past `max_size_mb`. Reading an entry counts as using it.
+    """
+
+    def __init__(self, cache_dir: str, max_size_mb: int):
+
+        self.cache_dir = cache_dir
+        self.max_size = max_size_mb * 1024 * 1024
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, key: str) -> Union[dict, None]:
+        """Return a cached result, or None on a miss"""
+
+        path = self._path(key)
+
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                result = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        # Bump for LRU
+        os.utime(path)
+        artifacts.touch(path)
+        logger.debug(f"[magenta]Cache hit: {key}")
+        return result
+
+    def put(self, key: str, result: dict):
+        """Store a result, then evict old entries if over size"""
+
+        entry = {
+            "text": result["text"],
+            "segments": result["segments"],
+            "language": result.get("language"),
+        }
+
+        with core.atomic_write(self._path(key)) as file:
+            json.dump(entry, file, default=float)
+        artifacts.register(self._path(key), "segments")
+
+        logger.debug(f"[magenta]Cached result: {key}")
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until under the size limit"""
+
+        entries = []
+        for x in os.scandir(self.cache_dir):
+            if x.name.endswith(".json"):
+                stat = x.stat()
+                entries.append((stat.st_mtime, stat.st_size, x.path))
+
+        total_size = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+
+            if total_size <= self.max_size:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+            total_size -= size
+            logger.debug(f"[magenta]Evicted '{os.path.basename(path)}'")
+
+
+def get_segment_cache() -> Union[SegmentCache, None]:
+    """Return the configured segment cache, or None if disabled"""
+
+    if not settings["cache"]["enabled"]:
+        return None
+
+    return SegmentCache(
+        cache_dir=os.path.join(
+            settings["paths"]["working_dir"], ".squawk_cache", "segments"
+        ),
+        max_size_mb=settings["cache"]["max_size_mb"],
+    )
@@ -0,0 +1,120 @@
+import logging
+from typing import Callable
+
+from squawk.settings import SettingsManager
+from squawk.utils import audio
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+
+def is_doubtful(segment: dict) -> bool:
+    """
+    Check whether a segment looks wrong enough to redo with a bigger model.
+
+    Uses the same signals Whisper uses to decide on a retry: low confidence,
+    repetitive text, or a likely hallucination over non-speech.
+
+    Args:
+        segment (dict): Whisper segment
+
+    Returns:
+        bool: True if the segment should be re-transcribed
+    """
+
+    cascade = settings["cascade"]
+
+    return (
+        segment.get("avg_logprob", 0.0) < cascade["logprob_threshold"]
+        or segment.get("compression_ratio", 0.0)
+        > cascade["compression_ratio_threshold"]
+        or segment.get("no_speech_prob", 0.0) > cascade["no_speech_threshold"]
+    )
+
+
+def doubtful_spans(segments: list) -> list:
+    """
+    Group runs of consecutive doubtful segments.
+
+    Args:
+        segments (list): Whisper segments, in order
+
+    Returns:
+        list: (first index, last index) of each run, inclusive
+    """
+
+    spans = []
+
+    for i, seg in enumerate(segments):
+
+        if not is_doubtful(seg):
+            continue
+
+        if spans and spans[-1][1] == i - 1:
+            spans[-1] = (spans[-1][0], i)
+        else:
+            spans.append((i, i))
+
+    return spans
+
+
+def refine(result: dict, pcm, transcribe_span: Callable) -> dict:
+    """
+    Re-transcribe the doubtful parts of a result with a bigger model.
+
+    Each run of doubtful segments is cut from the audio, re-transcribed
+    and its segments replaced, shifted back to their place in the audio.
+
+    Args:
+        result (dict): Whisper result from the fast model
+        pcm (np.ndarray): The audio `result` was transcribed from
+        transcribe_span (Callable): Transcribes a slice of PCM with the bigger model
+
+    Returns:
+        dict: Whisper result with doubtful segments replaced
+    """
+
+    segments = result["segments"]
+    spans = doubtful_spans(segments)
+
+    total = len(pcm) / audio.SAMPLE_RATE
+    escalated = sum(segments[b]["end"] - segments[a]["start"] for a, b in spans)
+
+    logger.info(
+        f"[cyan]Re-transcribing {len(spans)} passages "
+        f"({escalated / max(total, 0.001):.0%} of audio) "
+        f"with '{settings['cascade']['model']}'"
+    )
+
+    if not spans:
+        return result
+
+    refined = []
+    position = 0
+
+    for first, last in spans:
+
+        start = segments[first]["start"]
+        end = segments[last]["end"]
+
+        refined.extend(segments[position:first])
+
+        span_result = transcribe_span(
+            pcm[int(start * audio.SAMPLE_RATE) : int(end * audio.SAMPLE_RATE)]
+        )
+        refined.extend(
+            {**seg, "start": seg["start"] + start, "end": min(seg["end"] + start, end)}
+            for seg in span_result["segments"]
+        )
+
+        position = last + 1
+
+    refined.extend(segments[position:])
+    refined = [{**seg, "id": i} for i, seg in enumerate(refined)]
+
+    return {
+        **result,
+        "text": "".join(seg["text"] for seg in refined),
+        "segments": refined,
+    }
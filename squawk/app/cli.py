@@ -1,18 +1,19 @@
 #!/usr/bin/env python3.6
 
 import logging
-from typing import Optional
+from datetime import datetime
+from typing import List, Optional
 
 import typer
-from pyfiglet import Figlet
 from rich import print, traceback
 from rich.console import Console
 from rich.rule import Rule
-from pydavinci import davinci
-from pydavinci.exceptions import ObjectNotFound
-from squawk.app import main
+from squawk.app import session
 from squawk.utils import core, pkg_info
 
+# Heavy imports (whisper, torch, pydavinci) happen inside the commands that need them,
+# so '--help' and 'config' start quickly and work without Resolve running.
+
 # TODO: Add global option to hide banner
 # labels: enhancement
 hide_banner = typer.Option(
@@ -30,17 +31,50 @@ traceback.install(show_locals=False)
 cli_app = typer.Typer()
 
 console = Console()
-resolve = davinci.Resolve()
 
 
 @cli_app.callback(invoke_without_command=True)
-def run_without_args():
-    draw_banner()
-    print("Run [bold]squawk --help[/] for a list of commands")
+def run_without_args(
+    ctx: typer.Context,
+    precision: Optional[str] = typer.Option(
+        None, help="CPU inference precision, 'fp32' or 'int8'. Overrides user settings"
+    ),
+    threads: Optional[int] = typer.Option(
+        None, help="Torch threads for this job. Overrides user settings"
+    ),
+    interop_threads: Optional[int] = typer.Option(
+        None, help="Torch inter-op threads for this job. Overrides user settings"
+    ),
+):
+
+    run_checks()
+
+    overrides = {
+        "precision": precision,
+        "threads": threads,
+        "interop_threads": interop_threads,
+    }
+    overrides = {k: v for k, v in overrides.items() if v is not None}
+
+    if overrides.get("precision", "fp32") not in ["fp32", "int8"]:
+        logger.error(f"[red]Unknown precision '{precision}', choose 'fp32' or 'int8'")
+        core.app_exit(1, -1)
+
+    if overrides:
+        settings.update({"text_to_speech": {**settings["text_to_speech"], **overrides}})
+
+    # Shows how long each command spent waiting on Resolve
+    ctx.call_on_close(session.log_api_stats)
+
+    if ctx.invoked_subcommand is None:
+        draw_banner()
+        print("Run [bold]squawk --help[/] for a list of commands")
 
 
 def draw_banner():
 
+    from pyfiglet import Figlet
+
     # Print CLI title
     fig = Figlet(font="rectangles")
     text = fig.renderText("SQUAWK")
@@ -69,12 +103,13 @@ def draw_banner():
 
 
 def run_checks():
-    """Run before CLI App load."""
+    """
+    Run before CLI App load.
 
-    from squawk.settings import SettingsManager
-    from squawk.utils import checks
+    Never blocks. Update checks run in the background and report on the next run.
+    """
 
-    settings = SettingsManager()
+    from squawk.utils import checks
 
     # Check for any updates and inject version info into user settings.
     version_info = checks.check_for_updates(
@@ -110,25 +145,37 @@ def config():
 
 
 @cli_app.command("timeline")
-def transcribe_timeline(timeline_name: Optional[str] = typer.Argument(None)):
+def transcribe_timeline(
+    timeline_name: Optional[str] = typer.Argument(None),
+    full: bool = typer.Option(
+        False, "--full", help="Transcribe the whole timeline, even if unchanged"
+    ),
+):
 
     """
     Transcribe a Resolve timeline and import the transcription into Resolve.
+
+    Only ranges that changed since the timeline was last transcribed are re-rendered.
     """
 
-    if resolve.project.is_rendering():
+    from pydavinci.exceptions import ObjectNotFound
+    from squawk.app import incremental, main
+
+    resolve_session = session.get_session()
+
+    if resolve_session.project.is_rendering():
         logger.error(
             "[red]Resolve is currently rendering. We can't add any more jobs until it's finished"
         )
 
     # Change to edit page to clear any glitchy read-only mode
-    resolve.page = "edit"
+    resolve_session.resolve.page = "edit"
 
     # Switch if timeline chosen
     if timeline_name:
 
         try:
-            resolve.project.open_timeline(timeline_name)
+            resolve_session.open_timeline(timeline_name)
         except ObjectNotFound:
             logger.error(
                 f"[red]Could not open timeline[/] '{timeline_name}'"
@@ -136,7 +183,7 @@ def transcribe_timeline(timeline_name: Optional[str] = typer.Argument(None)):
             )
             core.app_exit(1, -1)
     else:
-        timeline_name = resolve.active_timeline.name
+        timeline_name = resolve_session.timeline_name
 
     print("\n")
     console.rule(
@@ -145,9 +192,20 @@ def transcribe_timeline(timeline_name: Optional[str] = typer.Argument(None)):
     )
     print("\n")
 
-    media_file = main.render_timeline(settings["paths"]["working_dir"])
-    srt_file = main.tts(media_file)
-    main.import_srt(srt_file)
+    if settings["text_to_speech"]["dual_subtitles"]:
+
+        # Dual subtitles always transcribe the whole timeline
+        if full:
+            logger.warning(
+                "[yellow]'--full' has no effect with dual subtitles, "
+                "the whole timeline is always transcribed"
+            )
+
+        srt_files = main.transcribe_timeline_dual()
+    else:
+        srt_files = [incremental.transcribe_timeline(full=full)]
+
+    main.import_srts(srt_files)
 
 
 @cli_app.command("file")
@@ -158,9 +216,270 @@ def transcribe_file(media_file: str):
     Args:
         media_file (str): Path to an ffmpeg supported media file.
     """
-    srt_file = main.tts(media_file)
-    main.import_srt(srt_file)
+
+    from squawk.app import main
+
+    if settings["text_to_speech"]["dual_subtitles"]:
+        srt_files = main.tts_dual(media_file)
+    else:
+        srt_files = [main.tts(media_file)]
+
+    main.import_srts(srt_files)
+
+
+@cli_app.command("timelines")
+def transcribe_timelines(
+    patterns: List[str] = typer.Argument(
+        ..., help="Timeline names or glob patterns, e.g. 'EP01 *'"
+    )
+):
+    """
+    Transcribe several Resolve timelines and import the transcriptions into Resolve.
+
+    All timelines are rendered in one go. Each is transcribed as soon as its render finishes.
+    """
+
+    from squawk.app import batch, main
+
+    resolve_session = session.get_session()
+
+    if resolve_session.project.is_rendering():
+        logger.error(
+            "[red]Resolve is currently rendering. We can't add any more jobs until it's finished"
+        )
+        core.app_exit(1, -1)
+
+    timeline_names = batch.find_timelines(patterns)
+
+    if not timeline_names:
+        logger.error("[red]No timelines match[/] " + ", ".join(patterns))
+        core.app_exit(1, -1)
+
+    # Change to edit page to clear any glitchy read-only mode
+    resolve_session.resolve.page = "edit"
+
+    print("\n")
+    console.rule(
+        f"[green bold]Transcribing {len(timeline_names)} timelines[/] :outbox_tray:",
+        align="left",
+    )
+    print("\n")
+
+    srt_files = batch.transcribe_timelines(timeline_names)
+
+    if not srt_files:
+        logger.error("[red]No timelines were transcribed")
+        core.app_exit(1, -1)
+
+    main.import_srts(srt_files)
+
+
+@cli_app.command("files")
+def transcribe_files(
+    paths: List[str] = typer.Argument(
+        ..., help="Media files, directories or glob patterns"
+    )
+):
+    """
+    Transcribe many media files and import the transcriptions into Resolve.
+
+    The model is loaded once for all files. Quote glob patterns to expand them here,
+    e.g. "dailies/**/*.mov".
+    """
+
+    from squawk.app import batch, main
+
+    media_files = batch.expand_paths(paths)
+
+    if not media_files:
+        logger.error("[red]No media files found")
+        core.app_exit(1, -1)
+
+    print("\n")
+    console.rule(
+        f"[green bold]Transcribing {len(media_files)} files[/] :outbox_tray:",
+        align="left",
+    )
+    print("\n")
+
+    srt_files = batch.transcribe_files(media_files)
+
+    if not srt_files:
+        logger.error("[red]No files were transcribed")
+        core.app_exit(1, -1)
+
+    main.import_srts(srt_files)
+
+
+@cli_app.command()
+def serve(
+    preload: Optional[List[str]] = typer.Option(
+        None, help="Model to load on startup. Can be passed multiple times"
+    )
+):
+    """
+    Run a transcription server that keeps models loaded between jobs.
+
+    While it's running, the 'timeline' and 'file' commands send their jobs to it.
+    """
+
+    from squawk.app import server
+
+    print("\n")
+    console.rule(
+        f"[green bold]Starting transcription server[/] :satellite_antenna:",
+        align="left",
+    )
+    print("\n")
+
+    server.serve(preload=preload)
+
+
+@cli_app.command("precision-check")
+def precision_check(
+    media_file: str,
+    seconds: int = typer.Option(60, help="Seconds of the file to compare on"),
+):
+    """
+    Compare int8 against fp32 on a reference clip, for speed and accuracy.
+
+    Transcribes the start of the file with each and reports the word error rate
+    of int8 against fp32. The first run also creates the cached int8 model.
+    """
+
+    from squawk.app import main, models
+    from squawk.utils import audio
+
+    model_name = settings["text_to_speech"]["model"]
+    pcm = audio.load_audio(media_file)[: seconds * audio.SAMPLE_RATE]
+
+    print("\n")
+    console.rule(
+        f"[green bold]Comparing fp32 and int8 '{model_name}' models[/] :scales:",
+        align="left",
+    )
+    print("\n")
+
+    report = models.compare_precision(model_name, pcm, main.get_decode_options())
+
+    for precision in ["fp32", "int8"]:
+        print(
+            f"[bold]{precision}[/] took {report[precision]['seconds']:.1f} seconds:\n"
+            f"{report[precision]['text'].strip()}\n"
+        )
+
+    speedup = report["fp32"]["seconds"] / max(report["int8"]["seconds"], 0.001)
+    print(
+        f"int8 is [bold]{speedup:.1f}x[/] as fast, "
+        f"with a [bold]{report['word_error_rate']:.1%}[/] word error rate against fp32"
+    )
+
+
+cache_app = typer.Typer(
+    help="Inspect and prune files squawk keeps in the working directory."
+)
+cli_app.add_typer(cache_app, name="cache")
+
+
+@cache_app.callback(invoke_without_command=True)
+def cache_summary(ctx: typer.Context):
+    """
+    Show what's in the working directory, by kind of file.
+    """
+
+    if ctx.invoked_subcommand is not None:
+        return
+
+    from rich.table import Table
+    from squawk.app import artifacts
+    from squawk.exceptions import ArtifactStoreLockedError
+
+    store = artifacts.get_store()
+
+    try:
+        entries = store.entries()
+    except ArtifactStoreLockedError:
+        logger.error(
+            "[red]The working directory is busy, another squawk is updating it. "
+            "Please try again in a moment."
+        )
+        core.app_exit(1, -1)
+
+    table = Table(title=f"Artifacts in '{store.root}'")
+    table.add_column("Kind")
+    table.add_column("Files", justify="right")
+    table.add_column("Size (MB)", justify="right")
+    table.add_column("Least recently used", justify="right")
+
+    for kind in artifacts.KINDS:
+
+        of_kind = [x for x in entries.values() if x["kind"] == kind]
+        if not of_kind:
+            continue
+
+        oldest = min(x["last_used"] for x in of_kind)
+        table.add_row(
+            kind,
+            str(len(of_kind)),
+            f"{sum(x['size'] for x in of_kind) / 1024 / 1024:.1f}",
+            datetime.fromtimestamp(oldest).strftime("%Y-%m-%d %H:%M"),
+        )
+
+    console.print(table)
+    print(
+        f"Total: {sum(x['size'] for x in entries.values()) / 1024 / 1024:.1f} MB "
+        f"of {settings['artifacts']['max_size_mb'] or 'unlimited'} MB"
+    )
+
+
+@cache_app.command("prune")
+def cache_prune(
+    max_size_mb: Optional[int] = typer.Option(
+        None, help="Evict least recently used files down to this size"
+    ),
+    max_age_days: Optional[float] = typer.Option(
+        None, help="Evict files unused for longer than this"
+    ),
+    everything: bool = typer.Option(
+        False, "--all", help="Evict everything not used in the last few minutes"
+    ),
+    dry_run: bool = typer.Option(
+        False, "--dry-run", help="Only list what would be evicted"
+    ),
+):
+    """
+    Evict files from the working directory. Uses the configured quotas by default.
+
+    Files used in the last few minutes are kept, in case another squawk process needs them.
+    """
+
+    from squawk.app import artifacts
+    from squawk.exceptions import ArtifactStoreLockedError
+
+    try:
+        evicted = artifacts.get_store().prune(
+            max_size_mb=max_size_mb,
+            max_age_days=max_age_days,
+            everything=everything,
+            dry_run=dry_run,
+        )
+    except ArtifactStoreLockedError:
+        logger.error(
+            "[red]The working directory is busy, another squawk is updating it. "
+            "Please try again in a moment."
+        )
+        core.app_exit(1, -1)
+
+    for x in evicted:
+        print(f"{'Would evict' if dry_run else 'Evicted'} '{x}'")
+
+    print(f"[green]{len(evicted)} files {'to evict' if dry_run else 'evicted'}[/]")
+
+
+def main():
+    cli_app()
 
 
 # RUN
-cli_app()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Iterator, Optional, Union
+
+import numpy as np
+from squawk.settings import SettingsManager
+from squawk.utils import audio
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+# Optional features an engine may have, checked by callers before use
+CAPABILITIES = {
+    "translate": "Accepts task='translate' to translate to English",
+    "detect_language": "Detects the spoken language when none is given",
+    "shared_encoder": "Exposes a Whisper model as `model`, for one encoder pass per task",
+}
+
+# Tasks an engine with the "translate" capability can run
+TASKS = ["transcribe", "translate"]
+
+# Target seconds per window, for `transcribe_window` and the batched and dual decoders.
+# Windows are cut at the quietest point within SEARCH_WINDOW of the target,
+# so none exceed Whisper's 30 seconds
+WINDOW_LENGTH = 20
+SEARCH_WINDOW = 5
+
+# Seconds per segment the mock engine returns
+MOCK_SEGMENT_LENGTH = 5.0
+
+# Seconds the mock engine sleeps per second of audio, to load-test with realistic timing
+MOCK_REALTIME_FACTOR = 0.0
+
+
+class Engine:
+    """
+    A speech to text backend.
+
+    Subclasses implement `load` and `transcribe_window`. Transcribing whole
+    files and streaming segments are built on those, so a new backend runs
+    through the whole pipeline without changes elsewhere. Backends with
+    their own long-form decoding can override `transcribe` as well.
+
+    Results are Whisper style dicts with "text", "segments" and "language".
+    """
+
+    name = ""
+    capabilities = frozenset()
+
+    def __init__(self):
+        self.model_name = None
+
+    def load(
+        self,
+        model_name: str,
+        precision: Optional[str] = None,
+        threads: Optional[int] = None,
+    ) -> "Engine":
+        """
+        Load model weights, ready to transcribe.
+
+        Args:
+            model_name (str): Model name, e.g. "medium"
+            precision (str, optional): "fp32" or "int8", if the engine supports a choice
+            threads (int, optional): CPU threads to use, if the engine supports a choice
+
+        Returns:
+            Engine: self, for chaining
+        """
+
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Run a throwaway pass so first-call allocations happen before real work"""
+
+    def transcribe_window(self, pcm: np.ndarray, **options) -> dict:
+        """
+        Transcribe up to 30 seconds of audio.
+
+        Args:
+            pcm (np.ndarray): Decoded PCM at `audio.SAMPLE_RATE`
+            **options: Keyword arguments as for `whisper.transcribe`
+
+        Returns:
+            dict: Whisper style result, timestamps relative to the window start
+        """
+
+        raise NotImplementedError
+
+    def _windows(self, pcm: np.ndarray, options: dict) -> Iterator[tuple]:
+        """Transcribe audio window by window, yielding (offset seconds, result)"""
+
+        bounds = audio.split_on_silence(pcm, WINDOW_LENGTH, SEARCH_WINDOW)
+
+        for start, end in bounds:
+
+            result = self.transcribe_window(pcm[start:end], **options)
+            yield start / audio.SAMPLE_RATE, result
+
+            # Keep the language detected in the first window
+            options = {"language": result.get("language"), **options}
+
+    def segments(self, pcm: np.ndarray, **options) -> Iterator[dict]:
+        """
+        Transcribe audio, yielding each segment as soon as it's ready.
+
+        Args:
+            pcm (np.ndarray): Decoded PCM at `audio.SAMPLE_RATE`
+            **options: Keyword arguments as for `whisper.transcribe`
+
+        Yields:
+            dict: Whisper style segment, timestamps relative to the audio start
+        """
+
+        for offset, result in self._windows(pcm, options):
+            for seg in result["segments"]:
+                yield {
+                    **seg,
+                    "start": seg["start"] + offset,
+                    "end": seg["end"] + offset,
+                }
+
+    def transcribe(self, media: Union[np.ndarray, str], **options) -> dict:
+        """
+        Transcribe audio of any length.
+
+        Args:
+            media (np.ndarray | str): Decoded PCM, or path to an ffmpeg supported media file
+            **options: Keyword arguments as for `whisper.transcribe`
+
+        Returns:
+            dict: Whisper style result
+        """
+
+        pcm = audio.load_audio(media) if isinstance(media, str) else media
+
+        segments = []
+        language = options.get("language")
+
+        for offset, result in self._windows(pcm, options):
+
+            language = language or result.get("language")
+            segments.extend(
+                {
+                    **seg,
+                    "id": len(segments) + i,
+                    "start": seg["start"] + offset,
+                    "end": seg["end"] + offset,
+                }
+                for i, seg in enumerate(result["segments"])
+            )
+
+        return {
+            "text": "".join(seg["text"] for seg in segments),
+            "segments": segments,
+            "language": language,
+        }
+
+
+class WhisperEngine(Engine):
+    """
+    The reference engine, openai-whisper on torch.
+
+    Long-form audio goes to Whisper's own `transcribe`, which seeks by
+    timestamp and conditions each window on the text before it.
+    With `text_to_speech.batch_size` above 1, decoded audio is instead
+    cut into independent windows and decoded in batches.
+    """
+
+    name = "whisper"
+    capabilities = frozenset({"translate", "detect_language", "shared_encoder"})
+
+    def __init__(self):
+        super().__init__()
+        self.model = None
+
+    def load(self, model_name, precision=None, threads=None):
+
+        from squawk.app import models
+
+        self.model = models.load_model(model_name, precision=precision, threads=threads)
+        self.model_name = model_name
+        return self
+
+    def warm_up(self):
+
+        from squawk.app import models
+
+        models.warm_up(self.model)
+
+    def transcribe_window(self, pcm, **options):
+        return self.model.transcribe(pcm, **options)
+
+    def transcribe(self, media, **options):
+
+        batch_size = settings["text_to_speech"]["batch_size"]
+
+        if batch_size > 1 and not isinstance(media, str):
+
+            from squawk.app import batching
+
+            return batching.transcribe_batched(
+                self.model,
+                media,
+                options,
+                batch_size,
+                settings["text_to_speech"]["batch_memory_mb"],
+            )
+
+        return self.model.transcribe(media, **options)
+
+
+class MockEngine(Engine):
+    """
+    Deterministic stand-in for a real engine, for testing the pipeline offline.
+
+    Cuts audio into fixed length segments labelled with a hash of their
+    samples, so identical audio always gives identical text. Silent
+    segments are dropped, as a real engine would. Needs no model weights.
+    """
+
+    name = "mock"
+    capabilities = frozenset({"translate", "detect_language"})
+
+    def load(self, model_name, precision=None, threads=None):
+
+        self.model_name = model_name
+        return self
+
+    def transcribe_window(self, pcm, **options):
+
+        task = options.get("task") or "transcribe"
+
+        if MOCK_REALTIME_FACTOR:
+            time.sleep(len(pcm) / audio.SAMPLE_RATE * MOCK_REALTIME_FACTOR)
+
+        step = int(MOCK_SEGMENT_LENGTH * audio.SAMPLE_RATE)
+        segments = []
+
+        for start in range(0, len(pcm), step):
+
+            samples = np.ascontiguousarray(pcm[start : start + step])
+            if not np.any(samples):
+                continue
+
+            digest = hashlib.sha1(samples.tobytes()).hexdigest()[:8]
+            segments.append(
+                {
+                    "id": len(segments),
+                    "seek": 0,
+                    "start": start / audio.SAMPLE_RATE,
+                    "end": (start + len(samples)) / audio.SAMPLE_RATE,
+                    "text": f" {task} {self.model_name} {digest}",
+                    "tokens": [],
+                    "temperature": 0.0,
+                    "avg_logprob": 0.0,
+                    "compression_ratio": 1.0,
+                    "no_speech_prob": 0.0,
+                }
+            )
+
+        return {
+            "text": "".join(seg["text"] for seg in segments),
+            "segments": segments,
+            "language": options.get("language") or "en",
+        }
+
+
+ENGINES = {engine.name: engine for engine in [WhisperEngine, MockEngine]}
+
+
+def load_engine(
+    model_name: str,
+    engine_name: Optional[str] = None,
+    precision: Optional[str] = None,
+    threads: Optional[int] = None,
+) -> Engine:
+    """
+    Load a model with the configured engine.
+
+    Args:
+        model_name (str): Model name, e.g. "medium"
+        engine_name (str, optional): One of `ENGINES`. Defaults to the user setting
+        precision (str, optional): Overrides the user setting, if the engine supports it
+        threads (int, optional): Overrides the user setting, if the engine supports it
+
+    Returns:
+        Engine: Loaded engine
+    """
+
+    engine_name = engine_name or settings["text_to_speech"]["engine"]
+    logger.debug(f"[magenta]Loading '{model_name}' with the {engine_name} engine")
+
+    return ENGINES[engine_name]().load(model_name, precision=precision, threads=threads)
+
+
+def load_engine_async(model_name: str) -> Future:
+    """
+    Load and warm up an engine on a background thread.
+
+    The thread is a daemon, so an unused load never delays exit.
+
+    Args:
+        model_name (str): Model name, e.g. "medium"
+
+    Returns:
+        Future: Resolves to the loaded engine
+    """
+
+    future = Future()
+
+    def load():
+
+        try:
+            engine = load_engine(model_name)
+            engine.warm_up()
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            logger.debug(f"[magenta]Model '{model_name}' ready")
+            future.set_result(engine)
+
+    threading.Thread(target=load, name="model-loader", daemon=True).start()
+    return future
@@ -0,0 +1,369 @@
+import json
+import logging
+import math
+import os
+import re
+from datetime import datetime
+from typing import Union
+
+from squawk.app import artifacts, cache, main, session
+from squawk.settings import SettingsManager
+from squawk.utils import core
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+# Seconds of context either side of a changed range, so words aren't clipped
+RANGE_PADDING = 1.0
+
+# Changed ranges closer together than this are rendered as one
+MIN_RANGE_GAP = 10.0
+
+
+def get_layout(timeline) -> list:
+    """
+    Describe a timeline's audio clip layout.
+
+    Args:
+        timeline (Timeline): pydavinci timeline
+
+    Returns:
+        list: One dict per audio clip with its track, source, source in point,
+            duration and record position, all in frames
+    """
+
+    layout = []
+
+    for track in range(1, timeline.track_count("audio") + 1):
+        for item in timeline.items("audio", track):
+
+            # Generators and compound clips have no media pool item
+            try:
+                source = item.mediapoolitem.media_id
+            except AttributeError:
+                source = None
+
+            layout.append(
+                {
+                    "track": track,
+                    "source": source or item.name,
+                    "in": item.left_offset,
+                    "duration": item.duration,
+                    "start": item.start,
+                    "end": item.end,
+                }
+            )
+
+    return layout
+
+
+def _item_key(item: dict) -> tuple:
+    return (item["track"], item["source"], item["in"], item["duration"])
+
+
+def _covering(layout: list, frame: float) -> set:
+    return {i for i, x in enumerate(layout) if x["start"] <= frame < x["end"]}
+
+
+def merge_ranges(ranges: list, gap: float = 0) -> list:
+    """Merge (start, end) ranges that overlap or are within `gap` of each other"""
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_ranges(ranges: list, remove: list) -> list:
+    """Remove the `remove` ranges from `ranges`. Both must be merged"""
+
+    result = []
+    for start, end in ranges:
+        for r_start, r_end in remove:
+            if r_end <= start or r_start >= end:
+                continue
+            if r_start > start:
+                result.append((start, r_start))
+            start = max(start, r_end)
+            if start >= end:
+                break
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+def match_clips(old: list, new: list) -> dict:
+    """
+    Pair clips present in both layouts.
+
+    A clip matches if it's on the same track with the same source,
+    in point and duration. It may have moved.
+
+    Returns:
+        dict: new clip index -> (old clip index, shift in frames)
+    """
+
+    unmatched = dict()
+    for i, x in enumerate(old):
+        unmatched.setdefault(_item_key(x), []).append(i)
+
+    matches = dict()
+    for j, x in enumerate(new):
+        candidates = unmatched.get(_item_key(x))
+        if candidates:
+            i = candidates.pop(0)
+            matches[j] = (i, x["start"] - old[i]["start"])
+
+    return matches
+
+
+def find_clean_ranges(old: list, new: list) -> list:
+    """
+    Find ranges of the new layout whose audio is unchanged, only moved.
+
+    A range is clean when every clip playing in it matches a clip
+    from the old layout, all moved by the same amount, and nothing
+    else played there in the old layout.
+
+    Returns:
+        list: (start, end, shift) in frames, in new layout positions
+    """
+
+    matches = match_clips(old, new)
+    clean = []
+
+    for j, (_, shift) in matches.items():
+
+        clip = new[j]
+        edges = {clip["start"], clip["end"]}
+
+        for x in new:
+            edges.update(
+                e for e in (x["start"], x["end"]) if clip["start"] < e < clip["end"]
+            )
+        for x in old:
+            edges.update(
+                e + shift
+                for e in (x["start"], x["end"])
+                if clip["start"] < e + shift < clip["end"]
+            )
+
+        edges = sorted(edges)
+        for start, end in zip(edges[:-1], edges[1:]):
+
+            mid = (start + end) / 2
+            new_stack = _covering(new, mid)
+            old_stack = _covering(old, mid - shift)
+
+            if all(
+                k in matches and matches[k][1] == shift for k in new_stack
+            ) and old_stack == {matches[k][0] for k in new_stack}:
+                clean.append((start, end, shift))
+
+    # Stacked clips report the same ranges, merge per shift
+    by_shift = dict()
+    for start, end, shift in clean:
+        by_shift.setdefault(shift, []).append((start, end))
+
+    return sorted(
+        (start, end, shift)
+        for shift, ranges in by_shift.items()
+        for start, end in merge_ranges(ranges)
+    )
+
+
+def plan_update(manifest: dict, layout: list, fps: float) -> tuple:
+    """
+    Work out which segments can be kept and which ranges need transcribing.
+
+    Args:
+        manifest (dict): Manifest from the last run
+        layout (list): Current timeline layout
+        fps (float): Timeline frame rate
+
+    Returns:
+        tuple:
+            - list: Kept segments, shifted to their new positions
+            - list: (start, end) seconds to re-transcribe, relative to timeline start
+    """
+
+    timeline_start = manifest["start_frame"]
+    old_layout = manifest["layout"]
+
+    def seconds(frame):
+        return (frame - timeline_start) / fps
+
+    clean = [
+        (seconds(start), seconds(end), shift / fps)
+        for start, end, shift in find_clean_ranges(old_layout, layout)
+    ]
+
+    occupied = merge_ranges([(seconds(x["start"]), seconds(x["end"])) for x in layout])
+    dirty = subtract_ranges(
+        occupied, merge_ranges([(start, end) for start, end, _ in clean])
+    )
+
+    kept = []
+    for seg in manifest["segments"]:
+
+        for start, end, shift in clean:
+            if start - shift <= seg["start"] and seg["end"] <= end - shift:
+                kept.append(
+                    {**seg, "start": seg["start"] + shift, "end": seg["end"] + shift}
+                )
+                break
+
+        else:
+            # Straddles a change, redo whatever part of it is still clean
+            for start, end, shift in clean:
+                seg_start, seg_end = seg["start"] + shift, seg["end"] + shift
+                if seg_start < end and seg_end > start:
+                    dirty.append((max(seg_start, start), min(seg_end, end)))
+
+    dirty = merge_ranges(
+        [(max(start - RANGE_PADDING, 0), end + RANGE_PADDING) for start, end in dirty]
+    )
+
+    # Padding may reach into kept segments, redo those too until nothing overlaps
+    while True:
+
+        overlapping = [
+            seg
+            for seg in kept
+            if any(seg["start"] < end and seg["end"] > start for start, end in dirty)
+        ]
+        if not overlapping:
+            break
+
+        kept = [x for x in kept if x not in overlapping]
+        dirty = merge_ranges(dirty + [(x["start"], x["end"]) for x in overlapping])
+
+    return kept, merge_ranges(dirty, gap=MIN_RANGE_GAP)
+
+
+def _manifest_path(project_name: str, timeline_name: str) -> str:
+
+    safe_name = re.sub(r"[^\w\- ]", "_", f"{project_name} - {timeline_name}")
+    return os.path.join(
+        settings["paths"]["working_dir"],
+        ".squawk_cache",
+        "manifests",
+        safe_name + ".json",
+    )
+
+
+def load_manifest(path: str) -> Union[dict, None]:
+
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_manifest(path: str, manifest: dict):
+
+    with core.atomic_write(path) as file:
+        json.dump(manifest, file, default=float)
+    artifacts.register(path, "manifest")
+
+
+def transcribe_timeline(full: bool = False) -> str:
+    """
+    Transcribe the active timeline, redoing only what changed since the last run.
+
+    The clip layout and subtitles of each run are stored in a per-timeline manifest.
+    On the next run, clips that are unchanged but may have moved keep their subtitles,
+    shifted to their new position. Only the remaining ranges are rendered and transcribed.
+
+    Args:
+        full (bool): Ignore the manifest and transcribe the whole timeline
+
+    Returns:
+        str: Path of the SRT file covering the whole timeline
+    """
+
+    resolve_session = session.get_session()
+    project_name = resolve_session.project_name
+    timeline_name = resolve_session.timeline_name
+    timeline = resolve_session.active_timeline
+
+    fps = float(timeline.get_setting("timelineFrameRate"))
+    timeline_start = timeline.start_frame
+    layout = get_layout(timeline)
+
+    transcription_info = cache.transcription_settings(
+        settings["text_to_speech"]["model"], main.get_decode_options()
+    )
+
+    manifest_path = _manifest_path(project_name, timeline_name)
+    manifest = None if full else load_manifest(manifest_path)
+
+    if manifest and (
+        manifest.get("transcription") != transcription_info
+        or manifest.get("fps") != fps
+    ):
+        logger.info("[yellow]Transcription settings changed, transcribing everything")
+        manifest = None
+
+    working_dir = settings["paths"]["working_dir"]
+
+    if manifest is None:
+
+        # Load the model while Resolve renders, both take a while
+        model_future = main.preload_model()
+
+        media_file = main.render_timeline(working_dir, layout=layout)
+        segments = main.get_transcription(media_file, model=model_future)["segments"]
+
+    else:
+
+        segments, ranges = plan_update(manifest, layout, fps)
+        logger.info(
+            f"[cyan]Keeping {len(segments)} subtitles, "
+            f"re-transcribing {len(ranges)} changed ranges"
+        )
+
+        model_future = main.preload_model() if ranges else None
+
+        for start, end in ranges:
+
+            mark_in = timeline_start + math.floor(start * fps)
+            mark_out = (
+                min(timeline_start + math.ceil(end * fps), timeline.end_frame) - 1
+            )
+            offset = (mark_in - timeline_start) / fps
+
+            media_file = main.render_timeline(working_dir, mark_in, mark_out, layout)
+            segments.extend(
+                {**seg, "start": seg["start"] + offset, "end": seg["end"] + offset}
+                for seg in main.get_transcription(media_file, model=model_future)[
+                    "segments"
+                ]
+            )
+
+        segments = sorted(segments, key=lambda x: x["start"])
+
+    segments = [{**seg, "id": i} for i, seg in enumerate(segments)]
+
+    save_manifest(
+        manifest_path,
+        {
+            "fps": fps,
+            "start_frame": timeline_start,
+            "transcription": transcription_info,
+            "layout": layout,
+            "segments": segments,
+        },
+    )
+
+    srt_name = (
+        f"{project_name} - {timeline_name} - {datetime.now().strftime('%H%M%S')}.srt"
+    )
+    return main.write_srt(
+        segments, os.path.join(working_dir, srt_name), source=timeline_name
+    )
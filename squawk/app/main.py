@@ -1,17 +1,27 @@
 import logging
 import os
 import time
+from concurrent.futures import Future
 from datetime import datetime
-from time import sleep
+from typing import Optional, Union
 
-import whisper
-from pydavinci import davinci
 from rich import traceback
 from rich.console import Console
 from rich.progress import Progress
+from squawk.app import (
+    artifacts,
+    cache,
+    cascade,
+    engines,
+    parallel,
+    render,
+    server,
+    session,
+    streaming,
+)
+from squawk.exceptions import TranscriptionServerError
 from squawk.settings import SettingsManager
-from squawk.utils import core
-from whisper import utils as whisper_utils
+from squawk.utils import audio, core, srt, vad
 
 # Init
 settings = SettingsManager()
@@ -19,7 +29,6 @@ logger = logging.getLogger(__name__)
 logger.setLevel(settings["app"]["loglevel"])
 traceback.install(show_locals=False)
 
-resolve = davinci.Resolve()
 console = Console()
 
 
@@ -31,107 +40,182 @@ def ensure_path(folder_path: str):
     Not a whole tree. Use it to create/ensure an output path.
     It also maintains last folder selection, so you don't need to reselect it.
 
+    Folders are looked up in the session's folder index, so the media pool
+    is only walked once per session however many paths are ensured.
+
     Args:
         folder_path (str): Path to create folder structure from
     """
 
     # cross platformish
     folder_path = folder_path.replace("\\", "/")
-    path_segments = folder_path.split("/")
-    path_segments = [x for x in path_segments if x != ""]
-
-    resolve = davinci.Resolve()
-    media_pool = resolve.media_pool
-    root_folder = media_pool.root_folder
-
-    def get_subfolder(parent_folder, subfolder_name: str):
-        """
-        Return a subfolder by name within a given parent folder.
-
-        Args:
-            current_folder (Folder): _description_
-            subfolder_name (str): _description_
-
-        Returns:
-            Folder: Subfolder as media pool folder object
-        """
-        for x in parent_folder.subfolders:
-            if x.name == subfolder_name:
-                return x
-        return None
+    path_segments = tuple(x for x in folder_path.split("/") if x != "")
 
-    # Started from the bottom now we're here
-    media_pool.set_current_folder(root_folder)
-    current_folder = root_folder
+    media_pool = session.get_session().media_pool
 
-    for i, seg in enumerate(path_segments):
+    for attempt in range(2):
 
-        # If folder exists, navigate
-        current_folder = media_pool.current_folder
-        if sub := get_subfolder(current_folder, seg):
-            logger.debug(f"[magenta]Found subfolder '{sub.name}'")
-            media_pool.set_current_folder(sub)
-            continue
+        index = session.get_folder_index()
 
-        # If not, make the whole structure
-        remaining_segs = path_segments[i:]
+        # Deepest folder along the path that already exists
+        depth = len(path_segments)
+        while path_segments[:depth] not in index:
+            depth -= 1
 
-        for x in remaining_segs:
+        if media_pool.set_current_folder(index[path_segments[:depth]]):
+            break
 
-            current_folder = media_pool.current_folder
-            logger.debug(
-                f"[magenta]Creating subfolder '{x}' in '{current_folder.name}'"
-            )
-            new_folder = media_pool.add_subfolder(x, current_folder)
-            if not media_pool.set_current_folder(new_folder):
+        # Indexed folder has gone, e.g. deleted by the user. Reindex and retry
+        logger.debug("[magenta]Media pool folder index is stale, rebuilding")
+        session.invalidate_folder_index()
 
-                logger.error(
-                    f"Couldn't create subfolder '{x}'"
-                    f"for path '{folder_path}' in media pool"
-                )
-        logger.debug("[magenta]Created folder structure")
+    else:
+
+        logger.error(f"Couldn't navigate to '{folder_path}' in media pool")
+        return
+
+    if depth == len(path_segments):
+        logger.debug("[magenta]Found all folders. Nothing created")
         return
 
-    logger.debug("[magenta]Found all folders. Nothing created")
+    # Make whatever part of the structure is missing
+    current_folder = index[path_segments[:depth]]
+
+    for i in range(depth, len(path_segments)):
+
+        logger.debug(
+            f"[magenta]Creating subfolder '{path_segments[i]}' in '{current_folder.name}'"
+        )
+        new_folder = media_pool.add_subfolder(path_segments[i], current_folder)
+        if not new_folder or not media_pool.set_current_folder(new_folder):
+
+            logger.error(
+                f"Couldn't create subfolder '{path_segments[i]}'"
+                f"for path '{folder_path}' in media pool"
+            )
+            session.invalidate_folder_index()
+            return
+
+        index[path_segments[: i + 1]] = new_folder
+        current_folder = new_folder
+
+    logger.debug("[magenta]Created folder structure")
     return
 
 
-def render_timeline(output_path: str) -> str:
+def add_render_job(
+    output_path: str, mark_in: Optional[int] = None, mark_out: Optional[int] = None
+) -> tuple:
+    """
+    Queue an audio render of the active timeline without starting it.
+
+    Args:
+        output_path (str): Directory to render into
+        mark_in (int, optional): First frame to render. Renders the whole timeline if omitted
+        mark_out (int, optional): Last frame to render, inclusive
+
+    Returns:
+        tuple: (render job id, path the media file will be rendered to)
+    """
 
-    project = resolve.project
-    timeline = resolve.active_timeline
+    resolve_session = session.get_session()
+    project = resolve_session.project
 
     custom_name = (
-        f"{project.name} - {timeline.name} - {datetime.now().strftime('%H%M%S')}"
+        f"{resolve_session.project_name} - {resolve_session.timeline_name}"
+        f" - {datetime.now().strftime('%H%M%S')}"
     )
-    output_file = os.path.join(output_path, custom_name + ".mov")
 
     # Open deliver page
-    resolve.page = "deliver"
+    resolve_session.resolve.page = "deliver"
 
     # Standard included preset - palette cleanser for weird file suffixes
     assert project.load_render_preset("H.264 Master")
 
-    render_settings = {
-        "SelectAllFrames": True,
-        "ExportVideo": False,
-        "ExportAudio": True,
-        "FormatWidth": 1280,  # Necessary
-        "FormatHeight": 720,  # Necessary
-        "AudioCodec": "aac",  # Not working?
-        "AudioBitDepth": 16,
-        "AudioSampleRate": 48000,
-        "CustomName": custom_name,
-        "TargetDir": output_path,
-    }
+    # Audio only PCM WAV can be read without ffmpeg. 48 kHz decimates cleanly to 16 kHz
+    if project.set_render_format_and_codec("wav", "LinearPCM"):
+
+        output_file = os.path.join(output_path, custom_name + ".wav")
+        render_settings = {
+            "SelectAllFrames": True,
+            "ExportVideo": False,
+            "ExportAudio": True,
+            "AudioBitDepth": 16,
+            "AudioSampleRate": 48000,
+            "CustomName": custom_name,
+            "TargetDir": output_path,
+        }
+
+    else:
+
+        logger.warning("[yellow]Couldn't set WAV render format, rendering MOV instead")
+
+        output_file = os.path.join(output_path, custom_name + ".mov")
+        render_settings = {
+            "SelectAllFrames": True,
+            "ExportVideo": False,
+            "ExportAudio": True,
+            "FormatWidth": 1280,  # Necessary
+            "FormatHeight": 720,  # Necessary
+            "AudioCodec": "aac",  # Not working?
+            "AudioBitDepth": 16,
+            "AudioSampleRate": 48000,
+            "CustomName": custom_name,
+            "TargetDir": output_path,
+        }
+
+    if mark_in is not None and mark_out is not None:
+        render_settings.update(
+            {"SelectAllFrames": False, "MarkIn": mark_in, "MarkOut": mark_out}
+        )
 
     assert project.set_render_settings(render_settings)
     render_job_id = project.add_renderjob()
     assert render_job_id
 
+    return render_job_id, output_file
+
+
+def render_timeline(
+    output_path: str,
+    mark_in: Optional[int] = None,
+    mark_out: Optional[int] = None,
+    layout: Optional[list] = None,
+) -> str:
+    """
+    Render the active timeline's audio.
+
+    If an identical timeline and range was rendered before and the file
+    is still there, it's reused without rendering.
+
+    Args:
+        output_path (str): Directory to render into
+        mark_in (int, optional): First frame to render. Renders the whole timeline if omitted
+        mark_out (int, optional): Last frame to render, inclusive
+        layout (list, optional): Timeline layout, if already fetched
+
+    Returns:
+        str: Path of the rendered media file
+    """
+
+    resolve_session = session.get_session()
+    project = resolve_session.project
+
+    fingerprint = render.timeline_fingerprint(
+        resolve_session.active_timeline, mark_in, mark_out, layout
+    )
+    if cached_file := render.find_cached_render(fingerprint):
+        logger.info(f"[green]Timeline unchanged, reusing render '{cached_file}'")
+        artifacts.touch(cached_file)
+        return cached_file
+
+    render_job_id, output_file = add_render_job(output_path, mark_in, mark_out)
+
     logger.info(f"[yellow]Rendering '{output_file}'")
     core.notify("Squawk", f"Rendering '{output_file}'")
 
+    watcher = render.RenderWatcher({render_job_id: output_file})
+
     try:
 
         if not project.render([render_job_id], interactive=False):
@@ -143,49 +227,288 @@ def render_timeline(output_path: str) -> str:
 
         with Progress(transient=True) as progress:
 
-            job_status = "Pending..."
-            progress_bar = progress.add_task(job_status, completed=0, total=100)
+            progress_bar = progress.add_task("Pending...", completed=0, total=100)
+            watcher.on_progress(
+                lambda _, job_status, percentage: progress.update(
+                    progress_bar, completed=percentage, description=job_status
+                )
+            )
 
-            while True:
+            job_status = watcher.wait()[render_job_id]
 
-                if job_status == "Complete":
-                    logger.info("[green]Render completed!")
-                    break
+    except KeyboardInterrupt:
 
-                elif job_status == "Cancelled":
-                    logger.error("[red]User cancelled job in Resolve")
-                    core.app_exit(1, -1)
+        logger.error("[red]User aborted - stopped render")
+        core.app_exit(1, -1)
 
-                status = project.render_status(render_job_id)
-                logger.debug(status)
+    if job_status != "Complete":
+        logger.error(f"[red]Render {job_status.lower()} in Resolve")
+        core.app_exit(1, -1)
 
-                job_status = str(status["JobStatus"])
-                percentage = float(status.get("CompletionPercentage", 0.0))
+    logger.info("[green]Render completed!")
+    logger.debug(f"[magenta]Media file: {output_file}")
+    render.save_cached_render(fingerprint, output_file)
+    artifacts.register(
+        output_file,
+        "render",
+        source=f"{resolve_session.project_name} - {resolve_session.timeline_name}",
+    )
+    core.notify("Squawk", "Finished rendering")
 
-                progress.update(
-                    progress_bar, completed=percentage, description=job_status
-                )
-                sleep(0.2)
+    return output_file
 
-        logger.debug(f"[magenta]Media file: {output_file}")
-        core.notify("Squawk", "Finished rendering")
 
-        return output_file
+def get_decode_options() -> dict:
+    """Whisper decode options derived from user settings"""
 
-    except KeyboardInterrupt:
+    if settings["text_to_speech"]["translate_to_english"]:
+        return {"task": "translate"}
+    return {}
 
-        # assert resolve.project.delete_renderjob(render_job_id) # Can we stop just a single job?
-        logger.error("[red]User aborted - cancel render manually!")
-        # core.notify("Squawk", "Aborted render!")
-        core.app_exit(1, -1)
 
+def transcribe(
+    pcm, media_file: str, model_name: str, decode_options: dict, model=None
+) -> dict:
+    """
+    Transcribe decoded audio with whichever backend is available.
+
+    Long audio goes to the worker pool if parallel transcription is enabled.
+    Otherwise a preloaded model is used if given. Failing that, a running
+    transcription server is preferred, since it already has the model loaded.
+    As a last resort, the model is loaded locally.
+
+    Without decoded PCM the file is streamed chunk by chunk instead,
+    which keeps memory flat but rules out the worker pool.
+
+    If voice activity detection is enabled, only the speech in decoded PCM
+    is transcribed. Timestamps are mapped back to the original audio.
+
+    In cascade mode, doubtful segments of decoded PCM are then
+    re-transcribed with the bigger `cascade.model`.
+
+    Args:
+        pcm (np.ndarray, None): Decoded PCM of `media_file`, or None to stream it
+        media_file (str): Path to the source media file
+        model_name (str): Whisper model name
+        decode_options (dict): Keyword arguments for `model.transcribe`
+        model (engines.Engine | Future, optional): Loaded engine, or a future from
+            `preload_model`. Only waited on if there's something to transcribe
+
+    Returns:
+        dict: Whisper transcription result
+    """
+
+    if pcm is None and settings["vad"]["enabled"]:
+        logger.warning(
+            "[yellow]Voice activity detection needs decoded audio, skipped while streaming"
+        )
+
+    if pcm is not None and settings["vad"]["enabled"]:
+
+        regions = vad.speech_map(
+            pcm, settings["vad"]["aggressiveness"], settings["vad"]["padding"]
+        )
+        speech_pcm, offset_map = vad.compact(pcm, regions)
+
+        logger.info(
+            f"[cyan]Found {len(speech_pcm) / audio.SAMPLE_RATE:.0f} seconds of speech "
+            f"in {len(pcm) / audio.SAMPLE_RATE:.0f} seconds of audio"
+        )
+
+        if not len(speech_pcm):
+            return {"text": "", "segments": [], "language": None}
+
+        result = _transcribe_cascaded(
+            speech_pcm, media_file, model_name, decode_options, model, send_pcm=True
+        )
+        return vad.restore_timestamps(result, offset_map)
+
+    return _transcribe_cascaded(pcm, media_file, model_name, decode_options, model)
+
+
+def _transcribe_cascaded(
+    pcm,
+    media_file: str,
+    model_name: str,
+    decode_options: dict,
+    model=None,
+    send_pcm: bool = False,
+) -> dict:
+    """Transcribe, then refine doubtful segments with the cascade model if enabled"""
+
+    result = _transcribe(pcm, media_file, model_name, decode_options, model, send_pcm)
+
+    if not settings["cascade"]["enabled"]:
+        return result
+
+    if pcm is None:
+        logger.warning(
+            "[yellow]Cascade mode needs decoded audio, skipped while streaming"
+        )
+        return result
+
+    cascade_model_name = settings["cascade"]["model"]
+    span_options = {"language": result.get("language"), **decode_options}
+
+    # Loaded once, not per passage. A running server already has it
+    cascade_model = None
+    use_server = server.is_running()
+
+    def transcribe_span(span_pcm):
+
+        nonlocal cascade_model
+        if cascade_model is None and not use_server:
+            cascade_model = engines.load_engine(cascade_model_name)
+
+        return _transcribe(
+            span_pcm,
+            media_file,
+            cascade_model_name,
+            span_options,
+            cascade_model,
+            send_pcm=True,
+        )
+
+    return cascade.refine(result, pcm, transcribe_span)
+
+
+def _transcribe(
+    pcm,
+    media_file: str,
+    model_name: str,
+    decode_options: dict,
+    model=None,
+    send_pcm: bool = False,
+) -> dict:
+    """Pick a backend for `transcribe`. `send_pcm` sends the PCM to a server, not the path"""
+
+    if pcm is not None and settings["parallel"]["enabled"]:
+
+        if len(pcm) > 2 * settings["parallel"]["chunk_length"] * audio.SAMPLE_RATE:
+            return parallel.transcribe(pcm, model_name, decode_options)
+
+        logger.debug("[magenta]Audio too short to split, transcribing sequentially")
+
+    # Only now that something needs transcribing is it worth waiting on a preload
+    if isinstance(model, Future):
+        model = model.result()
+
+    if model is None:
+
+        try:
+            result = server.request_transcription(
+                media_file,
+                model_name,
+                decode_options,
+                streaming=pcm is None,
+                pcm=pcm if send_pcm else None,
+            )
+        except TranscriptionServerError as e:
+            logger.warning(f"[yellow]{e}\nTranscribing locally instead")
+            result = None
+
+        if result is not None:
+            return result
+
+        model = engines.load_engine(model_name)
+
+    if pcm is None:
+        return streaming.transcribe_stream(model, media_file, decode_options)
+
+    return model.transcribe(pcm, **decode_options)
+
+
+def preload_model() -> Union[Future, None]:
+    """
+    Start loading the model in the background, if this process will need it.
+
+    Parallel transcription loads models in its workers and a running
+    transcription server already has one loaded, so neither needs it.
+
+    Returns:
+        Future: Resolves to the loaded engine
+        None: No local model is needed
+    """
+
+    if settings["parallel"]["enabled"] or server.is_running():
+        return None
+
+    return engines.load_engine_async(settings["text_to_speech"]["model"])
 
-def tts(media_file: str) -> str:
+
+def decode_for_transcription(media_file: str):
+    """
+    Decode a media file ready for `transcribe_cached`.
+
+    Returns:
+        np.ndarray: Decoded PCM
+        None: Streaming is enabled, the file is decoded during transcription instead
+    """
 
     if not os.path.exists(media_file):
         raise FileNotFoundError(f"Media file: {media_file} not found!")
 
-    model = whisper.load_model(settings["text_to_speech"]["model"])
+    if settings["text_to_speech"]["streaming"]:
+        return None
+
+    return audio.load_audio(media_file)
+
+
+def transcribe_cached(media_file: str, model=None, pcm=None) -> dict:
+    """
+    Transcribe a media file, reusing a cached result if the audio is unchanged.
+
+    Args:
+        media_file (str): Path to an ffmpeg supported media file
+        model (engines.Engine | Future, optional): Loaded engine, or a future from
+            `preload_model`. Only waited on if there's something to transcribe
+        pcm (np.ndarray, optional): Output of `decode_for_transcription`, if already decoded
+
+    Returns:
+        dict: Whisper transcription result
+    """
+
+    model_name = settings["text_to_speech"]["model"]
+    decode_options = get_decode_options()
+
+    if pcm is None:
+        pcm = decode_for_transcription(media_file)
+
+    # Key on decoded PCM, renders of the same audio differ in name and metadata
+    if pcm is None:
+        fingerprint = audio.fingerprint_file(media_file)
+    else:
+        fingerprint = audio.fingerprint(pcm)
+
+    cache_key = cache.make_key(fingerprint, model_name, decode_options)
+    segment_cache = cache.get_segment_cache()
+
+    result = segment_cache.get(cache_key) if segment_cache else None
+
+    if result is not None:
+        logger.info("[green]Audio unchanged since last run, using cached transcription")
+        return result
+
+    result = transcribe(pcm, media_file, model_name, decode_options, model=model)
+
+    if segment_cache:
+        segment_cache.put(cache_key, result)
+
+    return result
+
+
+def get_transcription(media_file: str, model=None) -> dict:
+    """
+    Transcribe a media file with progress and notifications.
+
+    Args:
+        media_file (str): Path to an ffmpeg supported media file
+        model (engines.Engine | Future, optional): Loaded engine, or a future from
+            `preload_model`. Only waited on if there's something to transcribe
+
+    Returns:
+        dict: Whisper transcription result
+    """
 
     core.notify("Squawk", "Starting transcription")
     start_time = time.time()
@@ -193,23 +516,155 @@ def tts(media_file: str) -> str:
     with Progress(transient=True) as progress:
 
         progress.add_task("[yellow]Transcribing", total=None)
-
-        if settings["text_to_speech"]["translate_to_english"]:
-            result = model.transcribe(media_file, task="translate")
-        else:
-            result = model.transcribe(media_file)
+        result = transcribe_cached(media_file, model=model)
 
     core.notify(
         "Squawk", f"Processing finished after {int(time.time() - start_time)} seconds"
     )
 
+    return result
+
+
+def write_srt(segments: list, srt_path: str, source: Optional[str] = None) -> str:
+    """Write segments to an SRT file, tracked as an artifact, and return its path"""
+
+    with open(srt_path, "w", encoding="utf-8") as srt_file:
+        srt.write_srt(segments, file=srt_file)
+
+    artifacts.register(srt_path, "srt", source=source)
+
+    return srt_path
+
+
+def tts(media_file: str, model=None) -> str:
+
+    result = get_transcription(media_file, model=model)
+
     srt_path = os.path.join(
         settings["paths"]["working_dir"], (os.path.basename(media_file) + ".srt")
     )
-    with open(srt_path, "w", encoding="utf-8") as srt:
-        whisper_utils.write_srt(result["segments"], file=srt)
+    return write_srt(result["segments"], srt_path, source=media_file)
 
-    return srt_path
+
+def _transcribe_and_translate(engine: engines.Engine, pcm) -> dict:
+    """Run both tasks, with one encoder pass if the engine allows it"""
+
+    if "shared_encoder" in engine.capabilities:
+
+        # Imports torch and whisper, which other engines don't need
+        from squawk.app import multitask
+
+        return multitask.transcribe_and_translate(engine.model, pcm, {})
+
+    if "translate" not in engine.capabilities:
+        logger.error(f"[red]The {engine.name} engine can't translate to English")
+        core.app_exit(1, -1)
+
+    results = {"transcribe": engine.transcribe(pcm, task="transcribe")}
+    results["translate"] = engine.transcribe(
+        pcm, task="translate", language=results["transcribe"]["language"]
+    )
+
+    return results
+
+
+def tts_dual(media_file: str, model=None) -> list:
+    """
+    Transcribe a media file and translate it to English.
+
+    Engines that allow it share one encoder pass between both tasks.
+    Always runs locally, the worker pool and transcription server only do one task.
+
+    Args:
+        media_file (str): Path to an ffmpeg supported media file
+        model (engines.Engine | Future, optional): Loaded engine, or a future from
+            `preload_model`. Only waited on if there's something to transcribe
+
+    Returns:
+        list: Paths of the transcription and translation SRT files
+    """
+
+    if not os.path.exists(media_file):
+        raise FileNotFoundError(f"Media file: {media_file} not found!")
+
+    skipped = [x for x in ["vad", "cascade", "parallel"] if settings[x]["enabled"]]
+    if skipped:
+        logger.warning(
+            f"[yellow]Dual subtitles don't support {', '.join(skipped)}, skipping"
+        )
+
+    model_name = settings["text_to_speech"]["model"]
+    pcm = audio.load_audio(media_file)
+
+    fingerprint = audio.fingerprint(pcm)
+    cache_keys = {
+        task: cache.make_key(fingerprint, model_name, {"task": task, "dual": True})
+        for task in engines.TASKS
+    }
+
+    segment_cache = cache.get_segment_cache()
+    results = {
+        task: segment_cache.get(key) if segment_cache else None
+        for task, key in cache_keys.items()
+    }
+
+    if None in results.values():
+
+        core.notify("Squawk", "Starting transcription and translation")
+        start_time = time.time()
+
+        with Progress(transient=True) as progress:
+
+            progress.add_task("[yellow]Transcribing and translating", total=None)
+
+            if isinstance(model, Future):
+                model = model.result()
+            if model is None:
+                model = engines.load_engine(model_name)
+            results = _transcribe_and_translate(model, pcm)
+
+        if segment_cache:
+            for task, key in cache_keys.items():
+                segment_cache.put(key, results[task])
+
+        core.notify(
+            "Squawk",
+            f"Processing finished after {int(time.time() - start_time)} seconds",
+        )
+
+    else:
+        logger.info("[green]Audio unchanged since last run, using cached transcription")
+
+    srt_base = os.path.join(
+        settings["paths"]["working_dir"], os.path.basename(media_file)
+    )
+    language = results["transcribe"]["language"] or "original"
+
+    return [
+        write_srt(
+            results["transcribe"]["segments"],
+            f"{srt_base}.{language}.srt",
+            source=media_file,
+        ),
+        write_srt(
+            results["translate"]["segments"], f"{srt_base}.en.srt", source=media_file
+        ),
+    ]
+
+
+def transcribe_timeline_dual() -> list:
+    """
+    Render the active timeline, then transcribe and translate it.
+
+    Returns:
+        list: Paths of the transcription and translation SRT files
+    """
+
+    # Load the model while Resolve renders, both take a while
+    model_future = engines.load_engine_async(settings["text_to_speech"]["model"])
+
+    media_file = render_timeline(settings["paths"]["working_dir"])
+    return tts_dual(media_file, model=model_future)
 
 
 def import_srt(srt_file):
@@ -217,13 +672,24 @@ def import_srt(srt_file):
     Import SRT file into Resolve
     """
 
-    resolve.page = "edit"
-    media_pool = resolve.media_pool
+    import_srts([srt_file])
+
+
+def import_srts(srt_files: list):
+    """
+    Import SRT files into Resolve with a single media pool call
+    """
+
+    resolve_session = session.get_session()
+    resolve_session.resolve.page = "edit"
+    media_pool = resolve_session.media_pool
 
     # Create or find path for srt file
     ensure_path(settings["resolve"]["subtitle_folder_path"])
 
-    logger.info(f"[cyan]Importing SRT file: '{srt_file}'")
-    mpi = media_pool.import_media([srt_file])
+    for x in srt_files:
+        logger.info(f"[cyan]Importing SRT file: '{x}'")
+
+    mpi = media_pool.import_media(srt_files)
     assert mpi
-    logger.debug(f"[magenta]Media pool item: {[mpi]}")
+    logger.debug(f"[magenta]Media pool items: {mpi}")
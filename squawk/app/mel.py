@@ -0,0 +1,172 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import torch
+import whisper
+from squawk.app import artifacts
+from squawk.settings import SettingsManager
+from squawk.utils import audio, core
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+# Bump when the stored features change, so old files are never read
+MEL_CACHE_VERSION = 1
+
+# Frames computed per STFT, bounds memory on long timelines. 5 minutes of audio
+FRAMES_PER_BLOCK = 30000
+
+# log10 of the power floor Whisper clamps to, what padding samples end up as
+LOG_FLOOR = -10.0
+
+# Whisper limits each window's dynamic range to this many decades below its peak
+DYNAMIC_RANGE = 8.0
+
+
+def cache_key(fingerprint: str, n_mels: int) -> str:
+    """
+    Build a cache key for the spectrogram of some audio.
+
+    Args:
+        fingerprint (str): Hash of the decoded PCM
+        n_mels (int): Mel bands the model expects
+
+    Returns:
+        str: Hex digest identifying the spectrogram
+    """
+
+    key_info = {
+        "version": MEL_CACHE_VERSION,
+        "audio": fingerprint,
+        "sample_rate": audio.SAMPLE_RATE,
+        "n_fft": whisper.audio.N_FFT,
+        "hop_length": whisper.audio.HOP_LENGTH,
+        "n_mels": n_mels,
+    }
+    return hashlib.sha256(
+        json.dumps(key_info, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def _compute(pcm: np.ndarray, out: np.ndarray):
+    """Fill `out` with the log10 mel power of `pcm`, one block of frames at a time"""
+
+    n_mels, n_frames = out.shape
+    window = torch.hann_window(whisper.audio.N_FFT)
+    filters = whisper.audio.mel_filters("cpu", n_mels)
+
+    # Centre the first frame on the first sample, as Whisper's STFT does
+    pad = whisper.audio.N_FFT // 2
+    padded = np.pad(pcm, pad, mode="reflect" if len(pcm) > pad else "constant")
+
+    for start in range(0, n_frames, FRAMES_PER_BLOCK):
+
+        stop = min(start + FRAMES_PER_BLOCK, n_frames)
+        block = padded[
+            start * whisper.audio.HOP_LENGTH : (stop - 1) * whisper.audio.HOP_LENGTH
+            + whisper.audio.N_FFT
+        ]
+
+        stft = torch.stft(
+            torch.from_numpy(np.ascontiguousarray(block)),
+            whisper.audio.N_FFT,
+            whisper.audio.HOP_LENGTH,
+            window=window,
+            center=False,
+            return_complex=True,
+        )
+        power = stft.abs() ** 2
+
+        out[:, start:stop] = torch.clamp(filters @ power, min=1e-10).log10().numpy()
+
+
+def log_spectrogram(pcm: np.ndarray, n_mels: int = 80) -> np.ndarray:
+    """
+    Log mel spectrogram of a whole asset, computed once and memory mapped.
+
+    Stored as a `.npy` in the working directory, keyed by the PCM and the
+    spectrogram parameters. Later runs on the same audio map the file
+    instead of recomputing it, whatever model or task they use.
+    With the cache disabled, it's computed in memory every time.
+
+    Only batched and dual transcription use this. The default path goes
+    through `model.transcribe`, which computes its own spectrogram.
+
+    Values are log10 power, before Whisper's per-window normalisation.
+    Use `window` to get model input from it.
+
+    Args:
+        pcm (np.ndarray): Decoded PCM at `audio.SAMPLE_RATE`
+        n_mels (int): Mel bands the model expects
+
+    Returns:
+        np.ndarray: (n_mels, frames), memory mapped read-only if cached
+    """
+
+    n_frames = len(pcm) // whisper.audio.HOP_LENGTH
+
+    if not settings["cache"]["enabled"] or not n_frames:
+        spectrogram = np.empty((n_mels, n_frames), dtype=np.float32)
+        _compute(pcm, spectrogram)
+        return spectrogram
+
+    cache_dir = os.path.join(settings["paths"]["working_dir"], ".squawk_cache", "mel")
+    path = os.path.join(cache_dir, cache_key(audio.fingerprint(pcm), n_mels) + ".npy")
+
+    try:
+        spectrogram = np.load(path, mmap_mode="r")
+        if spectrogram.shape == (n_mels, n_frames):
+            logger.debug(f"[magenta]Reusing spectrogram '{path}'")
+            artifacts.touch(path)
+            return spectrogram
+    except (OSError, ValueError):
+        pass
+
+    logger.debug(f"[magenta]Computing spectrogram of {n_frames} frames")
+
+    with core.atomic_path(path) as tmp_path:
+
+        spectrogram = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float32, shape=(n_mels, n_frames)
+        )
+        _compute(pcm, spectrogram)
+        spectrogram.flush()
+
+        # Unmapped before the rename, which Windows refuses on open files
+        del spectrogram
+    artifacts.register(path, "mel")
+
+    return np.load(path, mmap_mode="r")
+
+
+def window(spectrogram: np.ndarray, start: int, end: int) -> torch.Tensor:
+    """
+    Model input for the audio between two samples, padded to 30 seconds.
+
+    Matches `whisper.log_mel_spectrogram(whisper.pad_or_trim(pcm[start:end]))`,
+    except the frames at each edge also see the audio either side.
+
+    Args:
+        spectrogram (np.ndarray): Output of `log_spectrogram`
+        start (int): First sample
+        end (int): Sample after the last
+
+    Returns:
+        torch.Tensor: (n_mels, `whisper.audio.N_FRAMES`) normalised log-mel spectrogram
+    """
+
+    first = start // whisper.audio.HOP_LENGTH
+    count = min((end - start) // whisper.audio.HOP_LENGTH, whisper.audio.N_FRAMES)
+    count = max(min(count, spectrogram.shape[1] - first), 0)
+
+    mel = np.full(
+        (spectrogram.shape[0], whisper.audio.N_FRAMES), LOG_FLOOR, dtype=np.float32
+    )
+    mel[:, :count] = spectrogram[:, first : first + count]
+
+    mel = np.maximum(mel, mel.max() - DYNAMIC_RANGE)
+    return torch.from_numpy((mel + 4.0) / 4.0)
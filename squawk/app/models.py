@@ -0,0 +1,354 @@
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict
+from typing import Optional
+
+import numpy as np
+import torch
+import whisper
+from squawk.settings import SettingsManager
+from squawk.utils import core
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+# Where Whisper downloads its checkpoints, quantized models are kept alongside
+MODEL_CACHE_DIR = os.path.join(
+    os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "whisper",
+)
+
+
+def configure_threads(threads: int = 0, interop_threads: int = 0):
+    """
+    Limit the threads torch uses for this process. 0 keeps torch's default.
+
+    Torch defaults to every core, so concurrent jobs on one machine
+    fight over them unless each is given its share.
+
+    Args:
+        threads (int): Threads used within an op, e.g. a matrix multiply
+        interop_threads (int): Threads used to run independent ops in parallel
+    """
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Can only be set once, before any parallel work has run
+            logger.debug("[magenta]Inter-op threads already set, leaving as is")
+
+    logger.debug(
+        f"[magenta]Torch threads: {torch.get_num_threads()} intra-op, "
+        f"{torch.get_num_interop_threads()} inter-op"
+    )
+
+
+def _converted_path(model_name: str, variant: str) -> str:
+
+    # Converted models depend on Whisper's module layout and torch's format
+    whisper_version = getattr(whisper, "__version__", "unknown")
+    return os.path.join(
+        MODEL_CACHE_DIR,
+        f"{model_name}-{variant}-whisper{whisper_version}-torch{torch.__version__}.pt",
+    )
+
+
+def _save_converted(obj, path: str):
+    """Save atomically, so a concurrent squawk never loads a partial file"""
+
+    try:
+        with core.atomic_write(path, "wb") as file:
+            torch.save(obj, file)
+
+    except OSError as e:
+        logger.warning(f"[yellow]Couldn't save converted model: {e}")
+
+
+# Byte alignment of each tensor in a mapped weights file
+MMAP_ALIGNMENT = 64
+
+
+def _mmap_paths(model_name: str) -> tuple:
+    """Raw weights file and its index, for `_load_mmapped`"""
+
+    path = _converted_path(model_name, "fp32-mmap")
+    return os.path.splitext(path)[0] + ".bin", os.path.splitext(path)[0] + ".json"
+
+
+def _convert_for_mmap(model_name: str, weights_path: str, index_path: str):
+    """
+    Save a model's fp32 weights and buffers as raw arrays for `_load_mmapped`.
+
+    Whisper's checkpoints hold fp16 weights that are converted on every load,
+    so they can't be used in place. These are stored exactly as used on the CPU,
+    each at an aligned offset, with a JSON index of names, shapes and dtypes.
+    """
+
+    logger.info(
+        f"[cyan]Converting '{model_name}' model for fast loading, this happens once"
+    )
+
+    model = whisper.load_model(model_name, device="cpu")
+
+    tensors = {**dict(model.named_parameters()), **dict(model.named_buffers())}
+    index = {"dims": asdict(model.dims), "tensors": dict(), "sparse": []}
+
+    # The index is written last, so a concurrent squawk
+    # never finds an index without its complete weights file
+    with core.atomic_write(weights_path, "wb") as file:
+
+        for name, tensor in tensors.items():
+
+            if tensor.is_sparse:
+                index["sparse"].append(name)
+                tensor = tensor.to_dense()
+
+            array = tensor.detach().contiguous().numpy()
+
+            file.write(b"\0" * (-file.tell() % MMAP_ALIGNMENT))
+            index["tensors"][name] = {
+                "offset": file.tell(),
+                "shape": list(array.shape),
+                "dtype": array.dtype.str,
+            }
+            array.tofile(file)
+
+    with core.atomic_write(index_path) as file:
+        json.dump(index, file)
+
+
+@contextmanager
+def _skip_init():
+    """Build modules without initialising weights that are about to be replaced"""
+
+    modules = [
+        torch.nn.Linear,
+        torch.nn.modules.conv._ConvNd,
+        torch.nn.Embedding,
+        torch.nn.LayerNorm,
+    ]
+    originals = [module.reset_parameters for module in modules]
+
+    for module in modules:
+        module.reset_parameters = lambda self: None
+
+    try:
+        yield
+    finally:
+        for module, original in zip(modules, originals):
+            module.reset_parameters = original
+
+
+def _load_mmapped(model_name: str):
+    """
+    Load a model with its weights memory-mapped from a converted file.
+
+    Weights are paged in from the page cache on use rather than read and
+    deserialized up front, and every process on the machine shares them.
+    Maps with numpy, so it works with any torch version.
+
+    Returns:
+        whisper.Whisper: The loaded model
+    """
+
+    weights_path, index_path = _mmap_paths(model_name)
+
+    if not os.path.exists(index_path):
+        _convert_for_mmap(model_name, weights_path, index_path)
+
+    with open(index_path, "r", encoding="utf-8") as file:
+        index = json.load(file)
+
+    # Copy on write, so tensors are writable without ever touching the file
+    mapped = np.memmap(weights_path, mode="c")
+
+    # Uninitialised weights are never touched, so they never take up memory
+    with _skip_init():
+        model = whisper.model.Whisper(whisper.model.ModelDimensions(**index["dims"]))
+
+    for name, entry in index["tensors"].items():
+
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"]))
+
+        array = mapped[entry["offset"] : entry["offset"] + count * dtype.itemsize]
+        tensor = torch.from_numpy(array.view(dtype).reshape(entry["shape"]))
+
+        if name in index["sparse"]:
+            tensor = tensor.to_sparse()
+
+        module_name, _, tensor_name = name.rpartition(".")
+        module = model.get_submodule(module_name)
+
+        if tensor_name in module._parameters:
+            module._parameters[tensor_name] = torch.nn.Parameter(
+                tensor, requires_grad=False
+            )
+        else:
+            module._buffers[tensor_name] = tensor
+
+    logger.debug(f"[magenta]Memory-mapped model from '{weights_path}'")
+    return model
+
+
+def quantize(model):
+    """
+    Quantize a model's linear layers to int8, with dynamic activation scaling.
+
+    Linear layers hold most of Whisper's weights and compute,
+    so this roughly halves CPU inference time.
+
+    Args:
+        model (whisper.Whisper): Model loaded on the CPU in fp32
+
+    Returns:
+        whisper.Whisper: The quantized model
+    """
+
+    # Whisper subclasses Linear only to cast dtypes for fp16, which int8 doesn't use.
+    # Torch only quantizes exact Linear modules, so treat them as such.
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+
+    return torch.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def _load_quantized(model_name: str):
+    """Load a quantized model from disk, quantizing and saving it on first use"""
+
+    path = _converted_path(model_name, "int8")
+
+    try:
+        try:
+            model = torch.load(path, weights_only=False)
+        except TypeError:
+            # Older torch, always loads whole modules
+            model = torch.load(path)
+
+        logger.debug(f"[magenta]Loaded quantized model from '{path}'")
+        return model
+
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning(f"[yellow]Couldn't load quantized model, recreating: {e}")
+
+    logger.info(f"[cyan]Quantizing '{model_name}' model to int8, this happens once")
+    model = quantize(whisper.load_model(model_name, device="cpu"))
+    _save_converted(model, path)
+
+    return model
+
+
+def load_model(
+    model_name: str, precision: Optional[str] = None, threads: Optional[int] = None
+):
+    """
+    Load a Whisper model by name.
+
+    Single entry point for model loading, shared by local transcription
+    and the transcription server.
+
+    Args:
+        model_name (str): Whisper model name, e.g. "medium"
+        precision (str, optional): "fp32", or "int8" for quantized CPU inference.
+            Defaults to `text_to_speech.precision`
+        threads (int, optional): Intra-op threads. Defaults to `text_to_speech.threads`
+
+    Returns:
+        whisper.Whisper: The loaded model
+    """
+
+    precision = precision or settings["text_to_speech"]["precision"]
+
+    configure_threads(
+        settings["text_to_speech"]["threads"] if threads is None else threads,
+        settings["text_to_speech"]["interop_threads"],
+    )
+
+    logger.debug(f"[magenta]Loading model '{model_name}' ({precision})")
+
+    if precision == "int8":
+
+        if torch.cuda.is_available():
+            logger.warning("[yellow]int8 precision is CPU only, using the GPU in fp32")
+        else:
+            return _load_quantized(model_name)
+
+    # A GPU gets its own copy of the weights anyway, mapping only helps the CPU
+    if settings["text_to_speech"]["mmap_weights"] and not torch.cuda.is_available():
+
+        try:
+            return _load_mmapped(model_name)
+        except Exception as e:
+            logger.warning(f"[yellow]Couldn't memory-map model, loading normally: {e}")
+
+    return whisper.load_model(model_name)
+
+
+def warm_up(model):
+    """Run one encoder pass so first-call allocations happen before real work"""
+
+    mel = whisper.log_mel_spectrogram(np.zeros(whisper.audio.N_SAMPLES, np.float32))
+
+    with torch.no_grad():
+        model.embed_audio(mel.unsqueeze(0).to(model.device))
+
+
+def _word_error_rate(reference: str, hypothesis: str) -> float:
+
+    ref = reference.lower().split()
+    hyp = hypothesis.lower().split()
+
+    # Levenshtein distance over words, one row at a time
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+
+    return row[-1] / max(len(ref), 1)
+
+
+def compare_precision(model_name: str, pcm: np.ndarray, decode_options: dict) -> dict:
+    """
+    Transcribe the same audio in fp32 and int8, comparing speed and accuracy.
+
+    Args:
+        model_name (str): Whisper model name
+        pcm (np.ndarray): Reference clip, decoded
+        decode_options (dict): Keyword arguments for `model.transcribe`
+
+    Returns:
+        dict: Seconds taken and text per precision, and int8's word error rate against fp32
+    """
+
+    report = dict()
+
+    for precision in ["fp32", "int8"]:
+
+        model = load_model(model_name, precision=precision)
+
+        start_time = time.perf_counter()
+        result = model.transcribe(pcm, **decode_options)
+
+        report[precision] = {
+            "seconds": time.perf_counter() - start_time,
+            "text": result["text"],
+        }
+
+    report["word_error_rate"] = _word_error_rate(
+        report["fp32"]["text"], report["int8"]["text"]
+    )
+    return report
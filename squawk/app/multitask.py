@@ -0,0 +1,155 @@
+import logging
+
+import numpy as np
+import torch
+import whisper
+from squawk.app import engines, mel
+from squawk.settings import SettingsManager
+from squawk.utils import audio
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+# Seconds per timestamp token
+TIME_PRECISION = 0.02
+
+# Tokens of previous text fed back as a prompt, as `model.transcribe` does
+MAX_PROMPT_TOKENS = 223
+
+# Whisper's defaults for skipping windows with no speech
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+# Whisper's default for retrying a window at higher temperature
+COMPRESSION_RATIO_THRESHOLD = 2.4
+
+
+def parse_segments(tokenizer, result, offset: float, window_length: float) -> list:
+    """Split a decoded window into segments at its timestamp tokens"""
+
+    segments = []
+    start = None
+    last_end = 0.0
+    text_tokens = []
+
+    for token in result.tokens:
+
+        if token < tokenizer.timestamp_begin:
+            if token < tokenizer.eot:
+                text_tokens.append(token)
+            continue
+
+        time = min((token - tokenizer.timestamp_begin) * TIME_PRECISION, window_length)
+
+        if start is not None and text_tokens:
+            segments.append((start, time, text_tokens))
+            start, last_end, text_tokens = None, time, []
+        else:
+            start = time
+
+    if text_tokens:
+        segments.append(
+            (last_end if start is None else start, window_length, text_tokens)
+        )
+
+    return [
+        {
+            "seek": int(offset * audio.SAMPLE_RATE),
+            "start": offset + start,
+            "end": offset + end,
+            "text": tokenizer.decode(tokens),
+            "tokens": tokens,
+            "temperature": result.temperature,
+            "avg_logprob": result.avg_logprob,
+            "compression_ratio": result.compression_ratio,
+            "no_speech_prob": result.no_speech_prob,
+        }
+        for start, end, tokens in segments
+    ]
+
+
+def transcribe_and_translate(model, pcm: np.ndarray, decode_options: dict) -> dict:
+    """
+    Transcribe audio and translate it to English with one encoder pass.
+
+    The audio is cut at silences into windows of up to 30 seconds.
+    Each window is encoded once and both tasks are decoded from the
+    same encoder output, so the expensive half of inference isn't repeated.
+
+    Args:
+        model (whisper.Whisper): Loaded multilingual model
+        pcm (np.ndarray): Decoded PCM at `audio.SAMPLE_RATE`
+        decode_options (dict): Keyword arguments as for `model.transcribe`. `task` is ignored
+
+    Returns:
+        dict: Whisper style result per task, keyed "transcribe" and "translate"
+    """
+
+    language = decode_options.get("language")
+    fp16 = model.device.type == "cuda"
+
+    segments = {x: [] for x in engines.TASKS}
+    prompts = {x: [] for x in engines.TASKS}
+    tokenizers = dict()
+
+    bounds = audio.split_on_silence(pcm, engines.WINDOW_LENGTH, engines.SEARCH_WINDOW)
+    spectrogram = mel.log_spectrogram(pcm, model.dims.n_mels)
+
+    for i, (start, end) in enumerate(bounds):
+
+        offset = start / audio.SAMPLE_RATE
+        window_length = (end - start) / audio.SAMPLE_RATE
+
+        window_mel = mel.window(spectrogram, start, end).to(model.device).unsqueeze(0)
+        if fp16:
+            window_mel = window_mel.half()
+
+        with torch.no_grad():
+            features = model.embed_audio(window_mel)
+
+        if language is None:
+            _, probs = model.detect_language(features)
+            language = max(probs[0], key=probs[0].get)
+            logger.info(f"[cyan]Detected language: {language}")
+
+        logger.debug(f"[magenta]Window {i + 1}/{len(bounds)} at {offset:.1f} seconds")
+
+        for task in engines.TASKS:
+
+            if task not in tokenizers:
+                tokenizers[task] = whisper.tokenizer.get_tokenizer(
+                    model.is_multilingual, language=language, task=task
+                )
+
+            options = whisper.DecodingOptions(
+                task=task,
+                language=language,
+                temperature=0.0,
+                fp16=fp16,
+                prompt=prompts[task][-MAX_PROMPT_TOKENS:] or None,
+            )
+
+            with torch.no_grad():
+                result = model.decode(features, options)[0]
+
+            if (
+                result.no_speech_prob > NO_SPEECH_THRESHOLD
+                and result.avg_logprob < LOGPROB_THRESHOLD
+            ):
+                continue
+
+            window_segments = parse_segments(
+                tokenizers[task], result, offset, window_length
+            )
+            segments[task].extend(window_segments)
+            prompts[task].extend(x for seg in window_segments for x in seg["tokens"])
+
+    return {
+        task: {
+            "text": "".join(seg["text"] for seg in segments[task]),
+            "segments": [{**seg, "id": i} for i, seg in enumerate(segments[task])],
+            "language": language if task == "transcribe" else "en",
+        }
+        for task in engines.TASKS
+    }
@@ -0,0 +1,109 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from squawk.app import engines
+from squawk.settings import SettingsManager
+from squawk.utils import audio
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+# Each worker process loads its own copy of the model once
+_worker_model = None
+
+
+def _init_worker(model_name: str, precision: str, threads: int):
+
+    global _worker_model
+
+    _worker_model = engines.load_engine(
+        model_name, precision=precision, threads=threads
+    )
+
+
+def _transcribe_chunk(chunk: np.ndarray, decode_options: dict) -> dict:
+    return _worker_model.transcribe(chunk, **decode_options)
+
+
+def stitch(chunk_results: list, chunk_bounds: list) -> dict:
+    """
+    Join per-chunk transcription results into one.
+
+    Segment timestamps are shifted by each chunk's start time
+    and segment ids renumbered to run continuously.
+
+    Args:
+        chunk_results (list): Whisper results, one per chunk, in order
+        chunk_bounds (list): (start, end) sample offsets of each chunk
+
+    Returns:
+        dict: Whisper style result covering all chunks
+    """
+
+    segments = []
+
+    for result, (start, _) in zip(chunk_results, chunk_bounds):
+
+        offset = start / audio.SAMPLE_RATE
+
+        for seg in result["segments"]:
+            segments.append(
+                {
+                    **seg,
+                    "id": len(segments),
+                    "start": seg["start"] + offset,
+                    "end": seg["end"] + offset,
+                }
+            )
+
+    return {
+        "text": "".join(x["text"] for x in chunk_results),
+        "segments": segments,
+        "language": chunk_results[0].get("language") if chunk_results else None,
+    }
+
+
+def transcribe(pcm: np.ndarray, model_name: str, decode_options: dict) -> dict:
+    """
+    Transcribe audio in chunks across a pool of worker processes.
+
+    Audio is split at silences near every `parallel.chunk_length` seconds.
+    Results come back in chunk order regardless of which worker finishes first.
+
+    Args:
+        pcm (np.ndarray): Decoded PCM at `audio.SAMPLE_RATE`
+        model_name (str): Whisper model name
+        decode_options (dict): Keyword arguments for `model.transcribe`
+
+    Returns:
+        dict: Whisper style result
+    """
+
+    chunk_bounds = audio.split_on_silence(pcm, settings["parallel"]["chunk_length"])
+    workers = min(settings["parallel"]["workers"], len(chunk_bounds))
+
+    logger.info(
+        f"[cyan]Transcribing {len(chunk_bounds)} chunks across {workers} workers"
+    )
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(
+            model_name,
+            settings["text_to_speech"]["precision"],
+            settings["parallel"]["threads_per_worker"],
+        ),
+    ) as pool:
+
+        chunk_results = list(
+            pool.map(
+                _transcribe_chunk,
+                [pcm[start:end] for start, end in chunk_bounds],
+                [decode_options] * len(chunk_bounds),
+            )
+        )
+
+    return stitch(chunk_results, chunk_bounds)
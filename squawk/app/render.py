@@ -0,0 +1,329 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Optional, Union
+
+from squawk.app import session
+from squawk.settings import SettingsManager
+from squawk.utils import core
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+# Seconds between render status queries. Adapts between these bounds
+MIN_POLL_INTERVAL = 0.25
+MAX_POLL_INTERVAL = 5.0
+
+# Fraction of the estimated time left to wait before the next query
+POLL_FRACTION = 0.25
+
+# Seconds between checks of the output files' size, which costs no API call
+FILE_CHECK_INTERVAL = 0.25
+
+# Bump when render settings change, so older cached renders aren't reused
+RENDER_CACHE_VERSION = 1
+
+
+class RenderWatcher:
+    """
+    Wait on Resolve render jobs without flooding Resolve with status queries.
+
+    Resolve is queried less often the further a render is from finishing,
+    judged from the completion rate seen so far. In between, the output
+    files are watched on disk. A file that's still growing means the render
+    is progressing, and one that's stopped growing means it's probably done,
+    so Resolve is queried straight away.
+
+    Register callbacks to react as jobs progress and finish,
+    then either block with `wait` or run in the background with `start`.
+    """
+
+    def __init__(self, output_files: dict):
+        """
+        Args:
+            output_files (dict): Path each job renders to, keyed by render job id
+        """
+
+        self.output_files = dict(output_files)
+        self.statuses = {x: "Pending" for x in output_files}
+        self.percentages = {x: 0.0 for x in output_files}
+
+        self._progress_callbacks = []
+        self._complete_callbacks = []
+        self._history = []
+        self._file_sizes = {x: self._file_size(x) for x in output_files}
+        self._grown = set()
+        self._stop = threading.Event()
+
+    @property
+    def pending(self) -> list:
+        return [
+            x
+            for x, status in self.statuses.items()
+            if status not in session.FINAL_RENDER_STATUSES
+        ]
+
+    def on_progress(self, callback: Callable[[str, str, float], None]):
+        """Call `callback(job_id, status, percentage)` whenever a job is queried"""
+        self._progress_callbacks.append(callback)
+
+    def on_complete(self, callback: Callable[[str, str], None]):
+        """Call `callback(job_id, status)` once when a job completes, fails or is cancelled"""
+        self._complete_callbacks.append(callback)
+
+    def _file_size(self, job_id: str) -> int:
+        try:
+            return os.path.getsize(self.output_files[job_id])
+        except OSError:
+            return 0
+
+    def _files_settled(self) -> bool:
+        """Check output files on disk. True if any grew since the last query, then stopped"""
+
+        settled = False
+        for job_id in self.pending:
+
+            size = self._file_size(job_id)
+            if size > self._file_sizes[job_id]:
+                self._grown.add(job_id)
+            elif job_id in self._grown:
+                settled = True
+            self._file_sizes[job_id] = size
+
+        return settled
+
+    def _next_interval(self, interval: float) -> float:
+        """Estimate time left from the completion rate and wait a fraction of it"""
+
+        if len(self._history) >= 2:
+
+            (t0, p0), (t1, p1) = self._history[-2], self._history[-1]
+            if p1 > p0:
+                time_left = (100.0 * len(self.percentages) - p1) * (t1 - t0) / (p1 - p0)
+                interval = time_left * POLL_FRACTION
+
+        else:
+
+            # No rate yet, back off gently
+            interval *= 1.5
+
+        return min(max(interval, MIN_POLL_INTERVAL), MAX_POLL_INTERVAL)
+
+    def poll(self) -> bool:
+        """
+        Query Resolve for the status of all pending jobs once.
+
+        Returns:
+            bool: True if all jobs have finished
+        """
+
+        statuses = session.get_session().render_statuses(self.pending)
+        self._grown.clear()
+
+        for job_id, status in statuses.items():
+
+            job_status = str(status["JobStatus"])
+            percentage = float(status.get("CompletionPercentage", 0.0))
+            if job_status == "Complete":
+                percentage = 100.0
+
+            self.statuses[job_id] = job_status
+            self.percentages[job_id] = percentage
+
+            for callback in self._progress_callbacks:
+                callback(job_id, job_status, percentage)
+
+            if job_status in session.FINAL_RENDER_STATUSES:
+
+                logger.debug(f"[magenta]Render job {job_id}: {job_status}")
+                for callback in self._complete_callbacks:
+                    callback(job_id, job_status)
+
+        self._history.append((time.monotonic(), sum(self.percentages.values())))
+
+        return not self.pending
+
+    def wait(self) -> dict:
+        """
+        Block until all jobs have finished.
+
+        On Ctrl-C, the render is stopped in Resolve before re-raising.
+
+        Returns:
+            dict: Final status of each job, keyed by render job id
+        """
+
+        interval = MIN_POLL_INTERVAL
+
+        try:
+
+            while not self._stop.is_set() and not self.poll():
+
+                interval = self._next_interval(interval)
+                deadline = time.monotonic() + interval
+
+                while time.monotonic() < deadline and not self._stop.is_set():
+
+                    time.sleep(min(FILE_CHECK_INTERVAL, interval))
+                    if self._files_settled():
+                        break
+
+        except KeyboardInterrupt:
+
+            self.cancel()
+            raise
+
+        return dict(self.statuses)
+
+    def start(self) -> Future:
+        """
+        Wait on a background thread, leaving this one free for other work.
+
+        Returns:
+            Future: Resolves to the final status of each job
+        """
+
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self.wait())
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="render-watcher", daemon=True).start()
+        return future
+
+    def cancel(self):
+        """Stop rendering in Resolve and stop waiting"""
+
+        logger.warning("[yellow]Stopping render")
+        self._stop.set()
+
+        session.get_session().stop_rendering()
+
+
+def timeline_fingerprint(
+    timeline,
+    mark_in: Optional[int] = None,
+    mark_out: Optional[int] = None,
+    layout: Optional[list] = None,
+) -> str:
+    """
+    Fingerprint everything about a timeline that affects its rendered audio.
+
+    Covers the audio clip layout, source media, in and out points,
+    frame rate, which audio tracks are enabled and the rendered range.
+    Resolve's scripting API doesn't expose clip or track levels,
+    so level changes alone aren't detected.
+
+    Args:
+        timeline (Timeline): pydavinci timeline
+        mark_in (int, optional): First frame rendered
+        mark_out (int, optional): Last frame rendered
+        layout (list, optional): Timeline layout, if already fetched
+
+    Returns:
+        str: Hex digest
+    """
+
+    from squawk.app import incremental
+
+    if layout is None:
+        layout = incremental.get_layout(timeline)
+
+    track_count = timeline.track_count("audio")
+
+    # Not in older versions of Resolve
+    try:
+        tracks_enabled = [
+            timeline._obj.GetIsTrackEnabled("audio", x)
+            for x in range(1, track_count + 1)
+        ]
+    except AttributeError:
+        tracks_enabled = None
+
+    state = {
+        "version": RENDER_CACHE_VERSION,
+        "fps": timeline.get_setting("timelineFrameRate"),
+        "start_frame": timeline.start_frame,
+        "end_frame": timeline.end_frame,
+        "range": [mark_in, mark_out],
+        "tracks_enabled": tracks_enabled,
+        "layout": layout,
+    }
+
+    return hashlib.sha256(
+        json.dumps(state, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _render_cache_path(fingerprint: str) -> str:
+    return os.path.join(
+        settings["paths"]["working_dir"],
+        ".squawk_cache",
+        "renders",
+        fingerprint + ".json",
+    )
+
+
+def find_cached_render(fingerprint: str) -> Union[str, None]:
+    """
+    Return a previous render of an identical timeline, if it's still intact.
+
+    Args:
+        fingerprint (str): Timeline fingerprint
+
+    Returns:
+        str: Path of the rendered media file
+        None: Not rendered before, or the file has since changed
+    """
+
+    if not settings["cache"]["enabled"]:
+        return None
+
+    try:
+
+        with open(_render_cache_path(fingerprint), "r", encoding="utf-8") as file:
+            entry = json.load(file)
+
+        if os.path.getsize(entry["file"]) != entry["size"]:
+            return None
+
+    except (OSError, KeyError, json.JSONDecodeError):
+        return None
+
+    return entry["file"]
+
+
+def save_cached_render(fingerprint: str, media_file: str):
+    """
+    Record a finished render so an identical timeline can reuse it.
+
+    Args:
+        fingerprint (str): Timeline fingerprint
+        media_file (str): Path of the rendered media file
+    """
+
+    if not settings["cache"]["enabled"]:
+        return
+
+    path = _render_cache_path(fingerprint)
+
+    try:
+
+        entry = {
+            "file": os.path.abspath(media_file),
+            "size": os.path.getsize(media_file),
+        }
+
+        with core.atomic_write(path) as file:
+            json.dump(entry, file)
+
+    except OSError as e:
+        logger.warning(f"[yellow]Couldn't cache render: {e}")
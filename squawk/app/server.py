@@ -0,0 +1,366 @@
+import gc
+import logging
+import os
+import secrets
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from typing import Optional, Union
+
+from rich import traceback
+from squawk.app import engines, streaming
+from squawk.exceptions import TranscriptionServerError
+from squawk.settings import SettingsManager
+from squawk.utils import core
+
+# Init
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+traceback.install(show_locals=False)
+
+AUTHKEY_FILE = os.path.join(os.path.dirname(settings.user_file), "server.key")
+
+
+class ModelPool:
+    """
+    Keep loaded models resident between jobs.
+
+    Models are loaded on first use and unloaded once they've sat
+    unused for longer than `idle_timeout` seconds. Each engine and
+    precision of a model is loaded separately, since their output differs.
+    """
+
+    def __init__(self, idle_timeout: int):
+
+        self.idle_timeout = idle_timeout
+        self._models = dict()
+        self._last_used = dict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(
+        model_name: str, engine_name: Optional[str], precision: Optional[str]
+    ) -> str:
+
+        engine_name = engine_name or settings["text_to_speech"]["engine"]
+        precision = precision or settings["text_to_speech"]["precision"]
+        return f"{engine_name} {model_name} {precision}"
+
+    def get(
+        self,
+        model_name: str,
+        engine_name: Optional[str] = None,
+        precision: Optional[str] = None,
+    ):
+        """Return a loaded model, loading it if necessary"""
+
+        key = self._key(model_name, engine_name, precision)
+
+        with self._lock:
+
+            if key not in self._models:
+                logger.info(f"[yellow]Loading model '{key}'")
+                self._models[key] = engines.load_engine(
+                    model_name, engine_name=engine_name, precision=precision
+                )
+
+            self._last_used[key] = time.monotonic()
+            return self._models[key]
+
+    def touch(
+        self,
+        model_name: str,
+        engine_name: Optional[str] = None,
+        precision: Optional[str] = None,
+    ):
+        """Mark a model as used now, e.g. after a long job"""
+
+        key = self._key(model_name, engine_name, precision)
+
+        with self._lock:
+            if key in self._last_used:
+                self._last_used[key] = time.monotonic()
+
+    def unload_idle(self):
+        """Unload any models idle for longer than the timeout"""
+
+        if not self.idle_timeout:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+
+            idle = [
+                name
+                for name, last_used in self._last_used.items()
+                if now - last_used > self.idle_timeout
+            ]
+
+            for name in idle:
+                logger.info(f"[cyan]Unloading idle model '{name}'")
+                del self._models[name]
+                del self._last_used[name]
+
+        if idle:
+            gc.collect()
+
+    @property
+    def loaded(self) -> list:
+        return list(self._models.keys())
+
+
+def _write_authkey(authkey: bytes):
+    """Save this server session's key where clients can find it, readable only by the user"""
+
+    os.makedirs(os.path.dirname(AUTHKEY_FILE), exist_ok=True)
+    fd = os.open(AUTHKEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as file:
+        file.write(authkey.decode())
+
+
+def _read_authkey() -> Union[bytes, None]:
+
+    try:
+        with open(AUTHKEY_FILE, "r") as file:
+            return file.read().strip().encode()
+    except FileNotFoundError:
+        return None
+
+
+def _handle_connection(conn, pool: ModelPool, job_lock: threading.Lock):
+
+    with conn:
+
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+
+        try:
+
+            action = request.get("action")
+
+            if action == "ping":
+                conn.send({"status": "ok", "loaded": pool.loaded})
+
+            elif action == "transcribe":
+
+                logger.info(f"[yellow]Transcribing '{request['media_file']}'")
+                start_time = time.time()
+
+                warning = None
+                threads = request.get("threads")
+
+                # Torch threads are per process, fixed when the server loaded its models
+                if (
+                    threads is not None
+                    and threads != settings["text_to_speech"]["threads"]
+                ):
+                    warning = (
+                        f"The transcription server ignores the client's {threads} threads, "
+                        f"it uses its own setting of {settings['text_to_speech']['threads']}"
+                    )
+                    logger.warning(f"[yellow]{warning}")
+
+                # One job at a time, inference already saturates the device
+                with job_lock:
+                    model = pool.get(
+                        request["model"],
+                        request.get("engine"),
+                        request.get("precision"),
+                    )
+
+                    if request.get("pcm") is not None:
+                        result = model.transcribe(request["pcm"], **request["options"])
+                    elif request.get("streaming"):
+                        result = streaming.transcribe_stream(
+                            model, request["media_file"], request["options"]
+                        )
+                    else:
+                        result = model.transcribe(
+                            request["media_file"], **request["options"]
+                        )
+
+                    pool.touch(
+                        request["model"],
+                        request.get("engine"),
+                        request.get("precision"),
+                    )
+
+                logger.info(
+                    f"[green]Finished after {int(time.time() - start_time)} seconds"
+                )
+                conn.send({"status": "ok", "result": result, "warning": warning})
+
+            else:
+                conn.send({"status": "error", "message": f"Unknown action '{action}'"})
+
+        except Exception as e:
+
+            logger.exception(f"[red]Job failed:[/]\n{e}")
+            conn.send({"status": "error", "message": str(e)})
+
+
+def serve(preload: Union[list, None] = None):
+    """
+    Run the transcription server until interrupted.
+
+    Args:
+        preload (list, optional): Model names to load before accepting jobs
+    """
+
+    host = settings["server"]["host"]
+    port = settings["server"]["port"]
+    idle_timeout = settings["server"]["idle_timeout"]
+
+    pool = ModelPool(idle_timeout)
+    job_lock = threading.Lock()
+
+    def reap_idle_models():
+        while True:
+            time.sleep(min(idle_timeout, 30) or 30)
+            pool.unload_idle()
+
+    authkey = secrets.token_hex(32).encode()
+    wrote_authkey = False
+
+    try:
+        listener = Listener((host, port), authkey=authkey)
+    except OSError as e:
+        logger.error(
+            f"[red]Couldn't listen on {host}:{port}, "
+            f"is another transcription server already running?[/]\n{e}"
+        )
+        core.app_exit(1, -1)
+
+    try:
+
+        with listener:
+
+            for model_name in preload or []:
+                pool.get(model_name)
+
+            threading.Thread(target=reap_idle_models, daemon=True).start()
+
+            # Only once the port is ours, so a second server can't replace a running one's key
+            _write_authkey(authkey)
+            wrote_authkey = True
+
+            logger.info(f"[green]Listening for jobs on {host}:{port}")
+
+            while True:
+
+                try:
+                    conn = listener.accept()
+                except AuthenticationError:
+                    logger.warning("[yellow]Rejected client with invalid key")
+                    continue
+
+                threading.Thread(
+                    target=_handle_connection,
+                    args=(conn, pool, job_lock),
+                    daemon=True,
+                ).start()
+
+    except KeyboardInterrupt:
+        logger.info("[yellow]Shutting down transcription server")
+
+    finally:
+        if wrote_authkey and _read_authkey() == authkey:
+            os.remove(AUTHKEY_FILE)
+
+
+def _connect():
+    """Connect to a running server, or return None"""
+
+    authkey = _read_authkey()
+    if authkey is None:
+        return None
+
+    try:
+        return Client(
+            (settings["server"]["host"], settings["server"]["port"]),
+            authkey=authkey,
+        )
+    except (ConnectionRefusedError, AuthenticationError) as e:
+        logger.debug(f"[magenta]No transcription server available: {e}")
+        return None
+
+
+def is_running() -> bool:
+    """Check whether a transcription server is accepting jobs"""
+
+    conn = _connect()
+    if conn is None:
+        return False
+
+    with conn:
+        try:
+            conn.send({"action": "ping"})
+            return conn.recv()["status"] == "ok"
+        except (EOFError, ConnectionResetError):
+            return False
+
+
+def request_transcription(
+    media_file: str,
+    model_name: str,
+    options: dict,
+    streaming: bool = False,
+    pcm=None,
+) -> Union[dict, None]:
+    """
+    Send a transcription job to a running transcription server.
+
+    Args:
+        media_file (str): Path to an ffmpeg supported media file
+        model_name (str): Whisper model name
+        options (dict): Keyword arguments for `model.transcribe`
+        streaming (bool): Transcribe chunk by chunk to keep the server's memory flat
+        pcm (np.ndarray, optional): Decoded PCM to transcribe instead of the file
+
+    Returns:
+        dict: Whisper transcription result
+        None: No server is running
+
+    Raises:
+        TranscriptionServerError: The server couldn't process the job, or stopped during it
+    """
+
+    conn = _connect()
+    if conn is None:
+        return None
+
+    logger.info("[cyan]Sending job to transcription server")
+
+    with conn:
+        conn.send(
+            {
+                "action": "transcribe",
+                "media_file": os.path.abspath(media_file),
+                "model": model_name,
+                "options": options,
+                "streaming": streaming,
+                "pcm": pcm,
+                "engine": settings["text_to_speech"]["engine"],
+                "precision": settings["text_to_speech"]["precision"],
+                "threads": settings["text_to_speech"]["threads"],
+            }
+        )
+
+        try:
+            response = conn.recv()
+        except (EOFError, ConnectionResetError) as e:
+            raise TranscriptionServerError(
+                f"Lost connection to the transcription server: {e!r}"
+            )
+
+    if response["status"] != "ok":
+        raise TranscriptionServerError(response["message"])
+
+    if response.get("warning"):
+        logger.warning(f"[yellow]{response['warning']}")
+
+    return response["result"]
@@ -0,0 +1,382 @@
+import inspect
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from squawk.settings import SettingsManager
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+# Seconds a single Resolve API call can take before we warn it's stalling
+SLOW_CALL_THRESHOLD = 5.0
+
+# Render job statuses that never change once reached
+FINAL_RENDER_STATUSES = ["Complete", "Cancelled", "Failed"]
+
+_resolve = None
+_session = None
+
+# API call name: [count, total seconds]
+_api_stats = defaultdict(lambda: [0, 0.0])
+_api_stats_lock = threading.Lock()
+
+
+def _record_call(name: str, elapsed: float):
+
+    with _api_stats_lock:
+        stats = _api_stats[name]
+        stats[0] += 1
+        stats[1] += elapsed
+
+    if elapsed > SLOW_CALL_THRESHOLD:
+        logger.warning(
+            f"[yellow]Resolve took {elapsed:.1f} seconds to respond to '{name}'"
+        )
+
+
+def _trace(value):
+    """Wrap pydavinci objects, and lists of them, so their API calls are recorded"""
+
+    if isinstance(value, list):
+        return [_trace(x) for x in value]
+
+    if type(value).__module__.startswith("pydavinci"):
+        return _Traced(value)
+
+    return value
+
+
+def _untrace(value):
+
+    if isinstance(value, _Traced):
+        return object.__getattribute__(value, "_target")
+
+    if isinstance(value, list):
+        return [_untrace(x) for x in value]
+
+    return value
+
+
+class _Traced:
+    """
+    Transparent proxy over a pydavinci object that counts and times API calls.
+
+    pydavinci properties and public methods call into Resolve,
+    so both are recorded. Private attributes like `_obj` pass straight through.
+    """
+
+    __slots__ = ("_target",)
+
+    def __init__(self, target):
+        object.__setattr__(self, "_target", target)
+
+    def __getattr__(self, name: str):
+
+        target = object.__getattribute__(self, "_target")
+
+        if name.startswith("_"):
+            return getattr(target, name)
+
+        label = f"{type(target).__name__}.{name}"
+
+        if isinstance(inspect.getattr_static(type(target), name, None), property):
+
+            start = time.perf_counter()
+            value = getattr(target, name)
+            _record_call(label, time.perf_counter() - start)
+            return _trace(value)
+
+        value = getattr(target, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+
+            args = [_untrace(x) for x in args]
+            kwargs = {k: _untrace(v) for k, v in kwargs.items()}
+
+            start = time.perf_counter()
+            try:
+                return _trace(value(*args, **kwargs))
+            finally:
+                _record_call(label, time.perf_counter() - start)
+
+        return call
+
+    def __setattr__(self, name: str, value):
+
+        target = object.__getattribute__(self, "_target")
+
+        start = time.perf_counter()
+        setattr(target, name, _untrace(value))
+        _record_call(f"{type(target).__name__}.{name}=", time.perf_counter() - start)
+
+    def __eq__(self, other):
+        return _untrace(self) == _untrace(other)
+
+    def __hash__(self):
+        return hash(_untrace(self))
+
+    def __repr__(self):
+        return f"Traced({_untrace(self)!r})"
+
+
+def get_resolve():
+    """
+    Return the Resolve connection, connecting on first use.
+
+    Importing pydavinci connects to Resolve straight away,
+    so it's deferred until a command actually needs Resolve.
+    Every API call made through it is counted and timed.
+
+    Returns:
+        Resolve: pydavinci Resolve object
+    """
+
+    global _resolve
+
+    if _resolve is None:
+
+        from pydavinci import davinci
+
+        logger.debug("[magenta]Connecting to Resolve")
+
+        start = time.perf_counter()
+        _resolve = _Traced(davinci.Resolve())
+        _record_call("Resolve()", time.perf_counter() - start)
+
+    return _resolve
+
+
+class ResolveSession:
+    """
+    Memoised handles into Resolve for the length of a command.
+
+    The project, active timeline, media pool and root folder don't change
+    unless we change them, so each is fetched from Resolve once.
+    Use `open_timeline` to switch timelines so the handle stays valid.
+    """
+
+    def __init__(self):
+
+        self._handles = dict()
+        self._render_statuses = dict()
+        self._folder_index = None
+
+    def _handle(self, name: str, fetch):
+
+        if name not in self._handles:
+            self._handles[name] = fetch()
+        return self._handles[name]
+
+    @property
+    def resolve(self):
+        return get_resolve()
+
+    @property
+    def project(self):
+        return self._handle("project", lambda: self.resolve.project)
+
+    @property
+    def project_name(self) -> str:
+        return self._handle("project_name", lambda: self.project.name)
+
+    @property
+    def active_timeline(self):
+        return self._handle("active_timeline", lambda: self.resolve.active_timeline)
+
+    @property
+    def timeline_name(self) -> str:
+        return self._handle("timeline_name", lambda: self.active_timeline.name)
+
+    @property
+    def media_pool(self):
+        return self._handle("media_pool", lambda: self.resolve.media_pool)
+
+    @property
+    def root_folder(self):
+        return self._handle("root_folder", lambda: self.media_pool.root_folder)
+
+    def open_timeline(self, timeline_name: str) -> bool:
+        """
+        Open a timeline in the current project, making it the active timeline.
+
+        Args:
+            timeline_name (str): Name of the timeline to open
+
+        Returns:
+            bool: True if opened
+        """
+
+        self._handles.pop("active_timeline", None)
+        self._handles.pop("timeline_name", None)
+        return self.project.open_timeline(timeline_name)
+
+    def timeline_names(self) -> list:
+        """
+        Return the names of all timelines in the current project, in project order.
+
+        pydavinci has no way to list timelines, so this calls Resolve directly.
+        The calls are still recorded like the rest.
+
+        Returns:
+            list: Timeline names
+        """
+
+        project = _untrace(self.project)._obj
+
+        start = time.perf_counter()
+        count = project.GetTimelineCount()
+        _record_call("Project.GetTimelineCount", time.perf_counter() - start)
+
+        names = []
+        for index in range(1, count + 1):
+
+            start = time.perf_counter()
+            names.append(project.GetTimelineByIndex(index).GetName())
+            _record_call("Project.GetTimelineByIndex", time.perf_counter() - start)
+
+        return names
+
+    def stop_rendering(self):
+        """Stop any render in progress. pydavinci doesn't wrap this, so it's called directly"""
+
+        project = _untrace(self.project)._obj
+
+        start = time.perf_counter()
+        project.StopRendering()
+        _record_call("Project.StopRendering", time.perf_counter() - start)
+
+    def render_statuses(self, job_ids: list) -> dict:
+        """
+        Return the status of several render jobs.
+
+        Jobs that have already finished, failed or been cancelled
+        are answered from memory without querying Resolve again.
+
+        Args:
+            job_ids (list): Render job ids
+
+        Returns:
+            dict: Render status dict per job id, as returned by Resolve
+        """
+
+        for job_id in job_ids:
+
+            status = self._render_statuses.get(job_id)
+            if status and str(status["JobStatus"]) in FINAL_RENDER_STATUSES:
+                continue
+
+            self._render_statuses[job_id] = self.project.render_status(job_id)
+
+        return {x: self._render_statuses[x] for x in job_ids}
+
+    def render_status(self, job_id: str) -> dict:
+        return self.render_statuses([job_id])[job_id]
+
+    def _build_folder_index(self) -> dict:
+        """Walk the media pool folder tree once, indexing each folder by path"""
+
+        index = {(): self.root_folder}
+        queue = [((), self.root_folder)]
+
+        while queue:
+
+            path, folder = queue.pop()
+            for subfolder in folder.subfolders:
+
+                subpath = path + (subfolder.name,)
+
+                # Duplicate names resolve to the first found, like a linear scan would
+                if subpath not in index:
+                    index[subpath] = subfolder
+                    queue.append((subpath, subfolder))
+
+        return index
+
+    def get_folder_index(self) -> dict:
+        """
+        Return the media pool folder index, building it on first use.
+
+        Returns:
+            dict: Media pool folders, keyed by tuple of folder names from root
+        """
+
+        if self._folder_index is None:
+
+            logger.debug("[magenta]Indexing media pool folders")
+            self._folder_index = self._build_folder_index()
+            logger.debug(
+                f"[magenta]Indexed {len(self._folder_index)} media pool folders"
+            )
+
+        return self._folder_index
+
+    def invalidate_folder_index(self):
+        """Discard the folder index, e.g. after folders are changed outside squawk"""
+
+        self._folder_index = None
+
+    def reset(self):
+        """Forget all memoised handles, e.g. after switching project"""
+
+        self._handles.clear()
+        self._render_statuses.clear()
+        self._folder_index = None
+
+
+def get_session() -> ResolveSession:
+    """Return the session for this command, creating it on first use"""
+
+    global _session
+
+    if _session is None:
+        _session = ResolveSession()
+
+    return _session
+
+
+def get_folder_index() -> dict:
+    return get_session().get_folder_index()
+
+
+def invalidate_folder_index():
+    get_session().invalidate_folder_index()
+
+
+def api_stats() -> dict:
+    """
+    Return counts and total time of Resolve API calls made so far.
+
+    Returns:
+        dict: {call name: (count, total seconds)}
+    """
+
+    with _api_stats_lock:
+        return {k: tuple(v) for k, v in _api_stats.items()}
+
+
+def log_api_stats():
+    """Log a summary of Resolve API calls made by this command, slowest first"""
+
+    stats = api_stats()
+    if not stats:
+        return
+
+    count = sum(x[0] for x in stats.values())
+    total = sum(x[1] for x in stats.values())
+
+    lines = [
+        f"{name}: {calls} calls, {seconds:.3f}s"
+        for name, (calls, seconds) in sorted(
+            stats.items(), key=lambda x: x[1][1], reverse=True
+        )
+    ]
+
+    logger.debug(
+        f"[magenta]{count} Resolve API calls took {total:.2f} seconds\n"
+        + "\n".join(lines)
+    )
@@ -0,0 +1,93 @@
+import logging
+
+import numpy as np
+from squawk.app import parallel
+from squawk.settings import SettingsManager
+from squawk.utils import audio
+
+settings = SettingsManager()
+logger = logging.getLogger(__name__)
+logger.setLevel(settings["app"]["loglevel"])
+
+# Seconds of audio transcribed at once. Bounds peak memory
+CHUNK_LENGTH = 300
+
+# Seconds either side of each chunk boundary to search for silence
+SEARCH_WINDOW = 10
+
+# Seconds per energy frame when searching for silence
+FRAME_LENGTH = 0.02
+
+
+def iter_chunks(media_file: str):
+    """
+    Decode a media file into chunks cut at silences.
+
+    Only about one chunk of audio is held in memory at a time.
+
+    Args:
+        media_file (str): Path to an ffmpeg supported media file
+
+    Yields:
+        tuple: (start sample, chunk PCM)
+    """
+
+    target = CHUNK_LENGTH * audio.SAMPLE_RATE
+    search = SEARCH_WINDOW * audio.SAMPLE_RATE
+    frame = int(FRAME_LENGTH * audio.SAMPLE_RATE)
+
+    buffer = np.empty(0, dtype=np.float32)
+    offset = 0
+
+    for block in audio.iter_audio(media_file):
+
+        buffer = np.concatenate([buffer, block])
+
+        while len(buffer) >= target + search:
+
+            energy = audio.frame_energy(
+                buffer[target - search : target + search], frame
+            )
+            cut = target - search + int(np.argmin(energy)) * frame
+
+            yield offset, buffer[:cut]
+            buffer = buffer[cut:]
+            offset += cut
+
+    if len(buffer):
+        yield offset, buffer
+
+
+def transcribe_stream(model, media_file: str, decode_options: dict) -> dict:
+    """
+    Transcribe a media file chunk by chunk with bounded memory.
+
+    Each chunk's log-mel spectrogram is computed when it's transcribed,
+    so neither the PCM nor the spectrogram of the whole file is ever held.
+    The language detected in the first chunk is used for the rest.
+
+    Args:
+        model (engines.Engine): Loaded engine
+        media_file (str): Path to an ffmpeg supported media file
+        decode_options (dict): Keyword arguments for `model.transcribe`
+
+    Returns:
+        dict: Whisper style result
+    """
+
+    chunk_results = []
+    chunk_bounds = []
+
+    for offset, chunk in iter_chunks(media_file):
+
+        logger.debug(
+            f"[magenta]Transcribing chunk at {offset / audio.SAMPLE_RATE:.1f} seconds"
+        )
+
+        result = model.transcribe(chunk, **decode_options)
+        chunk_results.append(result)
+        chunk_bounds.append((offset, offset + len(chunk)))
+
+        decode_options = {"language": result.get("language"), **decode_options}
+
+    return parallel.stitch(chunk_results, chunk_bounds)
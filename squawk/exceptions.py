@@ -145,3 +145,35 @@ class ResolveInvalidRenderPresetError(Exception):
             )
 
         super().__init__(self.message)
+
+
+class ArtifactStoreLockedError(Exception):
+    """
+    Exception raised when the artifact index stays locked too long.
+
+    Another squawk process is holding the lock on the shared working directory.
+    """
+
+    def __init__(self, lock_file, message: str = ""):
+
+        self.lock_file = lock_file
+
+        if message != "":
+            self.message = message
+        else:
+            self.message = f"Timed out waiting for artifact index lock: '{lock_file}'"
+
+        super().__init__(self.message)
+
+
+class TranscriptionServerError(Exception):
+    """
+    Exception raised when the transcription server fails a job.
+
+    The server is reachable but returned an error instead of a transcription.
+    The server's own log has the full traceback.
+    """
+
+    def __init__(self, message: str = "Transcription server failed to process job."):
+        self.message = message
+        super().__init__(self.message)
@@ -1,3 +1,4 @@
+import json
 import logging
 import operator
 import os
@@ -8,16 +9,9 @@ from functools import reduce
 from operator import getitem
 from pathlib import Path
 
-from deepdiff import DeepDiff
 from rich import print, traceback
 from rich.prompt import Confirm, Prompt
-from ruamel.yaml import YAML
 from squawk.utils import core
-from yaspin import yaspin
-
-from schema import SchemaError
-
-from .schema import settings_schema
 
 traceback.install(show_locals=False)
 logger = logging.getLogger(__name__)
@@ -51,14 +45,19 @@ class SettingsManager(metaclass=Singleton):
         user_settings_file=USER_SETTINGS_FILE,
     ):
 
-        self.yaml = YAML()
-        self.yaml.indent(mapping=2, sequence=4, offset=2)
-        self.yaml.default_flow_style = False
-
         self.default_file = default_settings_file
         self.user_file = user_settings_file
+        self.snapshot_file = os.path.splitext(user_settings_file)[0] + ".snapshot.json"
         self.user_settings = dict()
 
+        # Neither settings file has changed since they were last validated
+        if self.__load_snapshot():
+            return
+
+        from yaspin import yaspin
+
+        self.__init_yaml()
+
         # Originally had default settings validated against schema too
         # but realised testing a path exists is not a good idea for defaults.
         # Instead let's write a build time test for this.
@@ -78,6 +77,7 @@ class SettingsManager(metaclass=Singleton):
         self.__load_user_file()
         self.__ensure_user_keys()
         self.__validate_schema()
+        self.__save_snapshot()
 
         self.spinner.ok("✅ ")
 
@@ -97,6 +97,60 @@ class SettingsManager(metaclass=Singleton):
 
             raise KeyError(e)
 
+    def __init_yaml(self):
+        from ruamel.yaml import YAML
+
+        self.yaml = YAML()
+        self.yaml.indent(mapping=2, sequence=4, offset=2)
+        self.yaml.default_flow_style = False
+
+    def __snapshot_key(self):
+        """Identify both settings files by path, mtime and size"""
+
+        key = []
+        for path in [self.default_file, self.user_file]:
+            stat = os.stat(path)
+            key.append([path, stat.st_mtime_ns, stat.st_size])
+        return key
+
+    def __load_snapshot(self) -> bool:
+        """
+        Load validated settings saved by a previous run.
+
+        Skips parsing, diffing and validating the YAML files,
+        as long as neither has changed since the snapshot was taken.
+
+        Returns:
+            bool: True if the snapshot was loaded
+        """
+
+        try:
+
+            with open(self.snapshot_file, "r", encoding="utf-8") as file:
+                snapshot = json.load(file)
+
+            if snapshot["key"] != self.__snapshot_key():
+                return False
+
+        except (OSError, KeyError, json.JSONDecodeError):
+            return False
+
+        logger.debug(f"Loaded settings snapshot from {self.snapshot_file}")
+        self.user_settings = snapshot["user_settings"]
+        return True
+
+    def __save_snapshot(self):
+        """Save validated user settings for the next run to load directly"""
+
+        snapshot = {"key": self.__snapshot_key(), "user_settings": self.user_settings}
+
+        try:
+            with core.atomic_write(self.snapshot_file) as file:
+                json.dump(snapshot, file)
+
+        except (OSError, TypeError) as e:
+            logger.debug(f"Couldn't save settings snapshot: {e}")
+
     def __load_default_file(self):
         """Load default settings from yaml"""
 
@@ -133,6 +187,11 @@ class SettingsManager(metaclass=Singleton):
 
         """
 
+        # Loaded from snapshot. Reload the file so its comments are kept
+        if not hasattr(self, "yaml"):
+            self.__init_yaml()
+            self.__load_user_file()
+
         reduce(getitem, key_list[:-1], self.user_settings)[key_list[-1]] = value
 
         with open(self.user_file, "w") as file_:
@@ -199,6 +258,8 @@ class SettingsManager(metaclass=Singleton):
     def __ensure_user_keys(self):
         """Ensure user settings have all keys in default settings"""
 
+        from deepdiff import DeepDiff
+
         self.spinner.stop()
 
         diffs = DeepDiff(self.default_settings, self.user_settings)
@@ -346,6 +407,10 @@ class SettingsManager(metaclass=Singleton):
     def __validate_schema(self):
         """Validate user settings against schema"""
 
+        from schema import SchemaError
+
+        from .schema import settings_schema
+
         logger.debug(f"Validating user settings against schema")
 
         try:
@@ -362,5 +427,5 @@ class SettingsManager(metaclass=Singleton):
             core.app_exit(1, -1)
 
     def update(self, dict_: dict):
-        logger.info(f"[yellow]Reconfigured settings:\n{dict_}")
+        logger.debug(f"[magenta]Reconfigured settings:\n{dict_}")
         self.user_settings.update(dict_)
@@ -1,7 +1,7 @@
 import re
 from commonregex import link
 import os
-from schema import Schema, And, Optional
+from schema import Schema, And, Optional, Or
 
 
 settings_schema = Schema(
@@ -11,6 +11,7 @@ settings_schema = Schema(
             in ["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
             "check_for_updates": bool,
             "update_check_url": lambda s: re.match(link, s),
+            "update_check_ttl": And(int, lambda n: n >= 0),
         },
         "paths": {
             "working_dir": lambda p: os.path.exists(p),
@@ -19,8 +20,48 @@ settings_schema = Schema(
             "subtitle_folder_path": str,
         },
         "text_to_speech": {
+            "engine": lambda s: s in ["whisper", "mock"],
             "model": lambda s: s in ["tiny", "small", "medium", "large"],
             "translate_to_english": bool,
+            "dual_subtitles": bool,
+            "precision": lambda s: s in ["fp32", "int8"],
+            "threads": And(int, lambda n: n >= 0),
+            "interop_threads": And(int, lambda n: n >= 0),
+            "batch_size": And(int, lambda n: n >= 1),
+            "batch_memory_mb": And(int, lambda n: n > 0),
+            "mmap_weights": bool,
+            "streaming": bool,
+        },
+        "cascade": {
+            "enabled": bool,
+            "model": lambda s: s in ["tiny", "small", "medium", "large"],
+            "logprob_threshold": Or(int, float),
+            "compression_ratio_threshold": And(Or(int, float), lambda n: n > 0),
+            "no_speech_threshold": And(Or(int, float), lambda n: 0 <= n <= 1),
+        },
+        "vad": {
+            "enabled": bool,
+            "aggressiveness": And(int, lambda n: 0 <= n <= 3),
+            "padding": And(Or(int, float), lambda n: n >= 0),
+        },
+        "server": {
+            "host": str,
+            "port": And(int, lambda n: 0 < n < 65536),
+            "idle_timeout": And(int, lambda n: n >= 0),
+        },
+        "cache": {
+            "enabled": bool,
+            "max_size_mb": And(int, lambda n: n > 0),
+        },
+        "artifacts": {
+            "max_size_mb": And(int, lambda n: n >= 0),
+            "max_age_days": And(int, lambda n: n >= 0),
+        },
+        "parallel": {
+            "enabled": bool,
+            "workers": And(int, lambda n: n > 0),
+            "threads_per_worker": And(int, lambda n: n > 0),
+            "chunk_length": And(int, lambda n: n >= 30),
         },
     },
     ignore_extra_keys=True,
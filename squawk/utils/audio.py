@@ -0,0 +1,360 @@
+import hashlib
+import logging
+import os
+import struct
+import subprocess
+from typing import Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Whisper's input rate. Defined here so importing this module doesn't import torch
+SAMPLE_RATE = 16000
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# (format tag, bits per sample): (numpy dtype, scale to [-1, 1])
+WAV_SAMPLE_TYPES = {
+    (WAVE_FORMAT_PCM, 16): ("<i2", 1 / 32768),
+    (WAVE_FORMAT_PCM, 32): ("<i4", 1 / 2147483648),
+    (WAVE_FORMAT_IEEE_FLOAT, 32): ("<f4", 1.0),
+}
+
+
+def read_wav_header(wav_file: str) -> Union[dict, None]:
+    """
+    Find the sample format and data offset of a WAV file.
+
+    Args:
+        wav_file (str): Path to a RIFF WAVE file
+
+    Returns:
+        dict: format tag, channels, sample rate, bits per sample, data offset and frame count
+        None: Not a WAV file, or a layout we can't memory map
+    """
+
+    with open(wav_file, "rb") as file:
+
+        riff = file.read(12)
+        if len(riff) < 12 or riff[:4] != b"RIFF" or riff[8:12] != b"WAVE":
+            return None
+
+        fmt = None
+        while True:
+
+            header = file.read(8)
+            if len(header) < 8:
+                return None
+
+            chunk_id, size = struct.unpack("<4sI", header)
+
+            if chunk_id == b"data":
+
+                if fmt is None:
+                    return None
+
+                block_align = fmt["channels"] * fmt["bits"] // 8
+                available = os.path.getsize(wav_file) - file.tell()
+
+                # Streamed WAVs may not have a valid data size
+                frames = min(size, available) // block_align
+                return {**fmt, "offset": file.tell(), "frames": frames}
+
+            if chunk_id == b"fmt ":
+
+                data = file.read(size)
+                tag, channels, rate, _, _, bits = struct.unpack("<HHIIHH", data[:16])
+
+                # Extensible format keeps the real tag in the sub-format GUID
+                if tag == WAVE_FORMAT_EXTENSIBLE and size >= 26:
+                    tag = struct.unpack("<H", data[24:26])[0]
+
+                fmt = {"tag": tag, "channels": channels, "rate": rate, "bits": bits}
+
+            else:
+                file.seek(size, os.SEEK_CUR)
+
+            # Chunks are word aligned
+            if size % 2:
+                file.seek(1, os.SEEK_CUR)
+
+
+def _lowpass_taps(factor: int) -> np.ndarray:
+    """Windowed-sinc anti-aliasing filter for decimating by `factor`"""
+
+    length = 16 * factor + 1
+    cutoff = 0.9 / (2 * factor)
+    n = np.arange(length) - (length - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(length)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+def _open_wav(wav_file: str) -> Union[tuple, None]:
+    """Memory map a WAV file's samples, or None if it needs ffmpeg"""
+
+    header = read_wav_header(wav_file)
+    if header is None:
+        return None
+
+    sample_type = WAV_SAMPLE_TYPES.get((header["tag"], header["bits"]))
+    if sample_type is None or header["rate"] % SAMPLE_RATE:
+        return None
+
+    dtype, scale = sample_type
+    samples = np.memmap(
+        wav_file,
+        dtype=dtype,
+        mode="r",
+        offset=header["offset"],
+        shape=(header["frames"], header["channels"]),
+    )
+    return header, samples, scale
+
+
+def _iter_wav(header: dict, samples: np.ndarray, scale: float, block_seconds: int):
+
+    factor = header["rate"] // SAMPLE_RATE
+    taps = _lowpass_taps(factor) if factor > 1 else None
+    half = len(taps) // 2 if factor > 1 else 0
+
+    block = header["rate"] * block_seconds  # Always a multiple of factor
+
+    for start in range(0, header["frames"], block):
+
+        end = min(start + block, header["frames"])
+
+        # Overlap neighbouring blocks so the filter is centred at every sample
+        lo, hi = max(start - half, 0), min(end + half, header["frames"])
+        mono = samples[lo:hi].mean(axis=1, dtype=np.float32)
+        mono *= scale
+
+        if factor > 1:
+            mono = np.pad(mono, (half - (start - lo), half - (hi - end)))
+            mono = np.convolve(mono, taps, mode="valid")[::factor]
+
+        yield np.ascontiguousarray(mono)
+
+
+def _iter_ffmpeg(media_file: str, block_seconds: int):
+
+    # Same conversion as `whisper.audio.load_audio`, read a block at a time
+    cmd = [
+        "ffmpeg",
+        "-nostdin",
+        "-threads",
+        "0",
+        "-i",
+        media_file,
+        "-f",
+        "s16le",
+        "-ac",
+        "1",
+        "-acodec",
+        "pcm_s16le",
+        "-ar",
+        str(SAMPLE_RATE),
+        "-",
+    ]
+
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    block_bytes = block_seconds * SAMPLE_RATE * 2
+
+    try:
+
+        while data := process.stdout.read(block_bytes):
+            yield np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+
+    except BaseException:
+        # Consumer stopped early, don't leave ffmpeg blocked on a full pipe
+        process.kill()
+        raise
+
+    finally:
+        process.stdout.close()
+        process.wait()
+
+    if process.returncode:
+        raise RuntimeError(f"ffmpeg failed to decode '{media_file}'")
+
+
+def iter_audio(media_file: str, block_seconds: int = 30):
+    """
+    Decode a media file to Whisper's input format a block at a time.
+
+    Memory use depends on the block length, not the file length.
+    Concatenating the blocks gives the same samples as `load_audio`.
+
+    Args:
+        media_file (str): Path to an ffmpeg supported media file
+        block_seconds (int): Seconds of audio per block
+
+    Yields:
+        np.ndarray: Mono float32 PCM at 16 kHz
+    """
+
+    if media_file.lower().endswith(".wav"):
+
+        wav = _open_wav(media_file)
+        if wav is not None:
+            yield from _iter_wav(*wav, block_seconds)
+            return
+
+    yield from _iter_ffmpeg(media_file, block_seconds)
+
+
+def load_wav(wav_file: str) -> Union[np.ndarray, None]:
+    """
+    Load a PCM WAV file to Whisper's input format without ffmpeg.
+
+    Samples are memory mapped and converted block by block.
+    Sample rates that are a whole multiple of 16 kHz (48 kHz, 32 kHz)
+    are decimated in place, so no resampler is needed.
+
+    Args:
+        wav_file (str): Path to a RIFF WAVE file
+
+    Returns:
+        np.ndarray: Mono float32 PCM at 16 kHz
+        None: The file needs ffmpeg to decode
+    """
+
+    wav = _open_wav(wav_file)
+    if wav is None:
+        return None
+
+    header = wav[0]
+    factor = header["rate"] // SAMPLE_RATE
+    pcm = np.empty(-(-header["frames"] // factor), dtype=np.float32)
+
+    position = 0
+    for block in _iter_wav(*wav, block_seconds=30):
+        pcm[position : position + len(block)] = block
+        position += len(block)
+
+    return pcm
+
+
+def load_audio(media_file: str) -> np.ndarray:
+    """
+    Decode a media file to Whisper's input format.
+
+    PCM WAV files are read directly. Anything else is decoded with ffmpeg.
+
+    Args:
+        media_file (str): Path to an ffmpeg supported media file
+
+    Returns:
+        np.ndarray: Mono float32 PCM at 16 kHz
+    """
+
+    if media_file.lower().endswith(".wav"):
+
+        pcm = load_wav(media_file)
+        if pcm is not None:
+            logger.debug(f"[magenta]Read PCM directly from '{media_file}'")
+            return pcm
+
+    from whisper import audio as whisper_audio
+
+    logger.debug(f"[magenta]Decoding audio from '{media_file}'")
+    return whisper_audio.load_audio(media_file, sr=SAMPLE_RATE)
+
+
+def fingerprint(audio: np.ndarray) -> str:
+    """
+    Hash decoded PCM samples.
+
+    Unlike hashing the media file itself, this ignores container metadata
+    and file names, so identical audio always gets the same fingerprint.
+
+    Args:
+        audio (np.ndarray): Decoded PCM, as returned by `load_audio`
+
+    Returns:
+        str: Hex digest of the samples
+    """
+
+    return hashlib.sha256(np.ascontiguousarray(audio).data).hexdigest()
+
+
+def fingerprint_file(media_file: str) -> str:
+    """
+    Hash a media file's decoded PCM without holding it all in memory.
+
+    Gives the same result as `fingerprint(load_audio(media_file))`.
+
+    Args:
+        media_file (str): Path to an ffmpeg supported media file
+
+    Returns:
+        str: Hex digest of the samples
+    """
+
+    digest = hashlib.sha256()
+    for block in iter_audio(media_file):
+        digest.update(block.data)
+    return digest.hexdigest()
+
+
+def frame_energy(audio: np.ndarray, frame_length: int) -> np.ndarray:
+    """
+    Mean square energy of consecutive non-overlapping frames.
+
+    Trailing samples that don't fill a whole frame are ignored.
+
+    Args:
+        audio (np.ndarray): Decoded PCM
+        frame_length (int): Samples per frame
+
+    Returns:
+        np.ndarray: One energy value per frame
+    """
+
+    frame_count = len(audio) // frame_length
+    frames = audio[: frame_count * frame_length].reshape(frame_count, frame_length)
+    return np.mean(np.square(frames, dtype=np.float32), axis=1)
+
+
+def split_on_silence(
+    audio: np.ndarray,
+    chunk_length: float,
+    search_window: float = 10.0,
+    frame_length: float = 0.02,
+) -> list:
+    """
+    Split audio into roughly equal chunks, cutting at the quietest point near each boundary.
+
+    Cutting in silence avoids splitting a word between two chunks.
+
+    Args:
+        audio (np.ndarray): Decoded PCM at `SAMPLE_RATE`
+        chunk_length (float): Target chunk length in seconds
+        search_window (float): Seconds either side of each target boundary to search for silence
+        frame_length (float): Seconds per energy frame
+
+    Returns:
+        list: (start, end) sample offsets of each chunk, in order
+    """
+
+    frame_samples = int(frame_length * SAMPLE_RATE)
+    chunk_frames = int(chunk_length / frame_length)
+    search_frames = int(search_window / frame_length)
+
+    energy = frame_energy(audio, frame_samples)
+
+    boundaries = [0]
+    target = chunk_frames
+    while target + chunk_frames // 2 < len(energy):
+
+        lo = max(target - search_frames, boundaries[-1] + 1)
+        hi = min(target + search_frames, len(energy))
+        quietest = lo + int(np.argmin(energy[lo:hi]))
+
+        boundaries.append(quietest)
+        target = quietest + chunk_frames
+
+    sample_bounds = [x * frame_samples for x in boundaries] + [len(audio)]
+    return list(zip(sample_bounds[:-1], sample_bounds[1:]))
@@ -1,21 +1,66 @@
+import json
 import logging
+import os
+import threading
+import time
 from typing import Union
 
-from rich.prompt import Confirm
 from squawk.settings import SettingsManager
-from yaspin import yaspin
-
-import pkg_info
+from squawk.utils import core, pkg_info
 
 settings = SettingsManager()
 
 logger = logging.getLogger(__name__)
 
+UPDATE_CHECK_CACHE_FILE = os.path.join(pkg_info.CACHE_DIR, "update_check.json")
+
+
+def _read_update_cache() -> Union[dict, None]:
+
+    try:
+        with open(UPDATE_CHECK_CACHE_FILE, "r") as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _write_update_cache(result: dict):
+
+    try:
+        with core.atomic_write(UPDATE_CHECK_CACHE_FILE) as file:
+            json.dump({"checked_at": time.time(), "result": result}, file)
+    except OSError:
+        pass
+
+
+def _refresh_update_cache(github_url: str, package_name: str):
+    """Query the remote for the latest commit and cache the result"""
+
+    build_info = pkg_info.get_build_info(package_name)
+    remote_commit = pkg_info.get_remote_current_commit(github_url)
+
+    if not remote_commit:
+        logger.debug("[magenta]Update check failed, probably offline")
+
+    result = {
+        "is_latest": remote_commit == build_info["version"] if remote_commit else None,
+        "remote_commit": remote_commit,
+        "package_commit": build_info["version"],
+        "commit_short_sha": build_info["version"][:7:],
+    }
+
+    # Failures are cached too, so an offline machine only retries once per TTL
+    _write_update_cache(result)
+
 
 def check_for_updates(github_url: str, package_name: str) -> Union[dict, None]:
 
     """Compare git origin to local git or package dist for updates
 
+    Never blocks. Returns the result of the last check and, if that's older
+    than `app.update_check_ttl` hours, starts a new check in the background.
+    Its result is used on the next run.
+
     Args:
         - github_url(str): origin repo url
         - package_name(str): offical package name
@@ -24,31 +69,22 @@ def check_for_updates(github_url: str, package_name: str) -> Union[dict, None]:
         - dict:
             - 'is_latest': bool,
             - 'current_version': git_short_sha
+        - None: No update info available yet
 
     Raises:
         - none
     """
 
-    latest = False
-
-    spinner = yaspin(
-        text="Checking for updates...",
-        color="cyan",
-    )
-    spinner.start()
-
     build_info = pkg_info.get_build_info(package_name)
     if build_info["build"] != "git":
 
-        spinner.fail("❌ ")
-        logger.warning(
-            "[yellow][bold]WIP:[/bold] Currently unable to check for release updates[/]"
+        logger.debug(
+            "[magenta][bold]WIP:[/bold] Currently unable to check for release updates[/]"
         )
         return None
 
     if not build_info["version"]:
 
-        spinner.fail("❌ ")
         logger.warning("[yellow]Unable to retrieve package version[/]")
         return None
 
@@ -61,17 +97,42 @@ def check_for_updates(github_url: str, package_name: str) -> Union[dict, None]:
             "commit_short_sha": build_info["version"][:7:],
         }
 
-    remote_commit = pkg_info.get_remote_current_commit(github_url)
+    cached = _read_update_cache()
+    ttl = settings["app"]["update_check_ttl"] * 3600
+
+    if cached is None or time.time() - cached["checked_at"] > ttl:
+
+        # Recorded as checked before the check starts, keeping the last result.
+        # Short commands often exit before it finishes, and shouldn't retry every run
+        _write_update_cache(
+            cached["result"]
+            if cached
+            else {
+                "is_latest": None,
+                "remote_commit": None,
+                "package_commit": build_info["version"],
+                "commit_short_sha": build_info["version"][:7:],
+            }
+        )
 
-    if not remote_commit or not build_info["version"]:
+        # Daemon thread, so a slow or offline check never delays exit
+        threading.Thread(
+            target=_refresh_update_cache,
+            args=(github_url, package_name),
+            daemon=True,
+        ).start()
 
-        spinner.fail("❌ ")
-        logger.warning("[red]Failed to check for updates[/]")
+    if cached is None:
         return None
 
-    elif remote_commit != build_info["version"]:
+    result = cached["result"]
+
+    # Cached against a build that's since changed
+    if result["package_commit"] != build_info["version"]:
+        return None
+
+    if result["is_latest"] is False:
 
-        spinner.ok("🔼 ")
         logger.warning(
             "[yellow]Update available.\n"
             + "Fully uninstall and reinstall when possible:[/]\n"
@@ -79,17 +140,7 @@ def check_for_updates(github_url: str, package_name: str) -> Union[dict, None]:
             + f'"pip install git+{github_url}"\n'
         )
 
-        logger.debug(f"Remote: {remote_commit}")
+        logger.debug(f"Remote: {result['remote_commit']}")
         logger.debug(f"Current: {build_info['version']}")
 
-    else:
-
-        latest = True
-        spinner.ok("✨ ")
-
-    return {
-        "is_latest": latest,
-        "remote_commit": remote_commit,
-        "package_commit": build_info["version"],
-        "commit_short_sha": build_info["version"][:7:],
-    }
+    return result
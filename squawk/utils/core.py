@@ -1,8 +1,10 @@
 import logging
+import os
 import sys
+import tempfile
 import time
+from contextlib import contextmanager
 
-from notifypy import Notify
 from rich.logging import RichHandler
 from rich.prompt import Prompt
 
@@ -82,6 +84,8 @@ def notify(title: str, message: str):
 
     try:
 
+        from notifypy import Notify
+
         notification = Notify()
         notification.title = title
         notification.message = message
@@ -92,3 +96,56 @@ def notify(title: str, message: str):
         return False
 
     return True
+
+
+@contextmanager
+def atomic_path(path: str):
+    """
+    Temporary path to write a file to, renamed over `path` once written.
+
+    Readers never see a partial file. If writing fails,
+    the temporary file is removed and `path` is left as it was.
+
+    Args:
+        path (str): Final path of the file. Its directory is created if needed
+
+    Yields:
+        str: Temporary path in the same directory
+    """
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "w"):
+    """
+    Open a file for writing that only replaces `path` once it's complete.
+
+    See `atomic_path`.
+
+    Args:
+        path (str): Final path of the file
+        mode (str): "w" for text, written as UTF-8, or "wb" for binary
+
+    Yields:
+        file: Open temporary file
+    """
+
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, mode, encoding=None if "b" in mode else "utf-8") as file:
+            yield file
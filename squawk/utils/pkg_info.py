@@ -1,15 +1,74 @@
 import json
+import logging
 import os
 import subprocess
-from distutils.sysconfig import get_python_lib
 from pathlib import Path
 from typing import Union
 
-import pkg_resources
-import requests
+# pkg_resources, requests and distutils are slow to import,
+# so they're imported by the functions that use them.
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(Path.home(), ".config", "squawk")
+BUILD_INFO_CACHE_FILE = os.path.join(CACHE_DIR, "build_info.json")
+
+PACKAGE_DIR = Path(__file__).resolve().parents[1]
+
+
+def _build_fingerprint() -> list:
+    """
+    Cheap signature of the installed code.
+
+    Reinstalling changes the package directory's mtime
+    and committing changes the checked out git ref.
+    """
+
+    paths = [PACKAGE_DIR]
+
+    git_head = PACKAGE_DIR.parent / ".git" / "HEAD"
+    if git_head.exists():
+        paths.append(git_head)
+        head = git_head.read_text().strip()
+        if head.startswith("ref: "):
+            paths.append(git_head.parent / head[5:])
+
+    return [[str(x), x.stat().st_mtime_ns] for x in paths if x.exists()]
 
 
 def get_build_info(package_name: str) -> dict:
+    """Get build info, computing it only when the installed code has changed.
+
+    Args:
+        - package_name (str): The name of the package to get last commit from.
+
+    Returns:
+        - dict: See `find_build_info`
+    """
+
+    fingerprint = _build_fingerprint()
+
+    try:
+        with open(BUILD_INFO_CACHE_FILE, "r") as file:
+            cached = json.load(file)
+        if cached["fingerprint"] == fingerprint:
+            return cached["build_info"]
+    except (FileNotFoundError, KeyError, json.JSONDecodeError):
+        pass
+
+    build_info = find_build_info(package_name)
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(BUILD_INFO_CACHE_FILE, "w") as file:
+            json.dump({"fingerprint": fingerprint, "build_info": build_info}, file)
+    except OSError:
+        pass
+
+    return build_info
+
+
+def find_build_info(package_name: str) -> dict:
     """Attempt to find the current commit SHA from the locally installed package or the local GitHub repo.
 
     Args:
@@ -24,6 +83,8 @@ def get_build_info(package_name: str) -> dict:
         - TypeError: When no versioning can be retrieved
     """
 
+    import pkg_resources
+
     # Are we running a pip-installed version built from git?
     try:
 
@@ -52,7 +113,10 @@ def get_build_info(package_name: str) -> dict:
     try:
 
         latest_commit_id = subprocess.check_output(
-            'git --no-pager log -1 --format="%H"', stderr=subprocess.STDOUT, shell=True
+            'git --no-pager log -1 --format="%H"',
+            stderr=subprocess.STDOUT,
+            shell=True,
+            cwd=PACKAGE_DIR.parent,
         ).decode()
 
         return {
@@ -91,6 +155,8 @@ def get_remote_current_commit(github_url: str) -> Union[str, None]:
         - TypeError: Caught by try/except; used to jump between blocks, readability.
     """
 
+    import requests
+
     url_list = github_url.split(".com")[1].split("/")
     api_endpoint = (
         f"https://api.github.com/repos/{url_list[1]}/{url_list[2]}/commits/main"
@@ -100,14 +166,15 @@ def get_remote_current_commit(github_url: str) -> Union[str, None]:
 
         r = requests.get(api_endpoint, timeout=8)
         if not str(r.status_code).startswith("2"):
-            print(
+            # Runs in the background, so keep it out of the console
+            logger.debug(
                 f"[red]Couldn't connect to GitHub API\n[/]"
                 + f"[yellow]HTTP status code:[/] {r.status_code}\n\n"
             )
             return None
 
     except Exception as e:
-        print(f"[red]Couldn't connect to GitHub API:[/]\n{e}")
+        logger.debug(f"[red]Couldn't connect to GitHub API:[/]\n{e}")
         return None
 
     results = r.json()
@@ -132,6 +199,8 @@ def get_script_from_package(script_name: str) -> str:
         script_path (str): Absolute path to the installed script
     """
 
+    from distutils.sysconfig import get_python_lib
+
     package_dir = Path(get_python_lib()).resolve().parents[1]
     scripts_dir = os.path.join(package_dir, "Scripts")
 
@@ -0,0 +1,43 @@
+from typing import TextIO
+
+
+def format_timestamp(seconds: float) -> str:
+    """
+    Format seconds as an SRT timestamp.
+
+    Args:
+        seconds (float): Non-negative time in seconds
+
+    Returns:
+        str: Timestamp as "HH:MM:SS,mmm"
+    """
+
+    milliseconds = round(max(seconds, 0.0) * 1000)
+
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1000)
+
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d},{milliseconds:03d}"
+
+
+def write_srt(segments: list, file: TextIO):
+    """
+    Write segments to a file in SRT format.
+
+    Args:
+        segments (list): Segments with "start", "end" and "text", in order
+        file (TextIO): Open text file to write to
+    """
+
+    for i, segment in enumerate(segments, start=1):
+
+        # "-->" in the text would be read as a timing line
+        text = segment["text"].strip().replace("-->", "->")
+
+        print(
+            f"{i}\n"
+            f"{format_timestamp(segment['start'])} --> {format_timestamp(segment['end'])}\n"
+            f"{text}\n",
+            file=file,
+        )
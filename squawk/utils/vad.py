@@ -0,0 +1,221 @@
+import logging
+
+import numpy as np
+from squawk.utils.audio import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Seconds per analysis frame
+FRAME_LENGTH = 0.03
+
+# Frames analysed per FFT batch, bounds memory on long timelines
+FRAMES_PER_BLOCK = 8192
+
+# Speech carries most of its energy in this band, in Hz
+SPEECH_BAND = (100, 4000)
+
+# Per aggressiveness level 0-3:
+# dB above the noise floor, minimum fraction of energy in the speech band,
+# and maximum spectral flatness (white noise is around 0.56)
+ENERGY_MARGINS = [3.0, 6.0, 9.0, 12.0]
+BAND_RATIOS = [0.55, 0.65, 0.75, 0.85]
+FLATNESS_LIMITS = [0.5, 0.4, 0.3, 0.2]
+
+# Frames quieter than this are never speech, however quiet the noise floor
+ABSOLUTE_FLOOR_DB = -60.0
+
+# Seconds of smoothing, so gaps between words don't split speech
+SMOOTHING = 0.3
+
+# Speech regions shorter than this are dropped as clicks and bumps
+MIN_SPEECH = 0.1
+
+# Seconds of silence placed between speech regions when compacting
+COMPACT_GAP = 0.3
+
+
+def frame_features(audio: np.ndarray, frame_length: int) -> tuple:
+    """
+    Energy, speech band ratio and spectral flatness of consecutive frames.
+
+    Args:
+        audio (np.ndarray): Decoded PCM at `SAMPLE_RATE`
+        frame_length (int): Samples per frame
+
+    Returns:
+        tuple: (energy in dB, speech band ratio, flatness), one array each
+    """
+
+    frame_count = len(audio) // frame_length
+    n_fft = 1 << (frame_length - 1).bit_length()
+
+    window = np.hanning(frame_length).astype(np.float32)
+    freqs = np.fft.rfftfreq(n_fft, 1 / SAMPLE_RATE)
+    band = (freqs >= SPEECH_BAND[0]) & (freqs <= SPEECH_BAND[1])
+
+    energy = np.empty(frame_count, dtype=np.float32)
+    ratio = np.empty(frame_count, dtype=np.float32)
+    flatness = np.empty(frame_count, dtype=np.float32)
+
+    for start in range(0, frame_count, FRAMES_PER_BLOCK):
+
+        stop = min(start + FRAMES_PER_BLOCK, frame_count)
+        frames = audio[start * frame_length : stop * frame_length].reshape(
+            -1, frame_length
+        )
+
+        energy[start:stop] = 10 * np.log10(
+            np.mean(np.square(frames, dtype=np.float32), axis=1) + 1e-10
+        )
+
+        power = np.abs(np.fft.rfft(frames * window, n=n_fft, axis=1)) ** 2 + 1e-12
+        total = np.sum(power, axis=1)
+
+        ratio[start:stop] = np.sum(power[:, band], axis=1) / total
+        flatness[start:stop] = np.exp(np.mean(np.log(power), axis=1)) / np.mean(
+            power, axis=1
+        )
+
+    return energy, ratio, flatness
+
+
+def speech_map(
+    audio: np.ndarray, aggressiveness: int = 1, padding: float = 0.5
+) -> list:
+    """
+    Find the regions of audio that likely contain speech.
+
+    Frames count as speech when they're loud enough above the noise floor,
+    have most of their energy in the speech band and aren't noise-like.
+    Music, ambience and silence mostly fail one of those.
+
+    Args:
+        audio (np.ndarray): Decoded PCM at `SAMPLE_RATE`
+        aggressiveness (int): 0-3. Higher skips more non-speech, but may clip quiet speech
+        padding (float): Seconds kept either side of each speech region
+
+    Returns:
+        list: (start, end) sample offsets of speech regions, in order and non-overlapping
+    """
+
+    frame_length = int(FRAME_LENGTH * SAMPLE_RATE)
+    if len(audio) < frame_length:
+        return []
+
+    energy, ratio, flatness = frame_features(audio, frame_length)
+    noise_floor = np.percentile(energy, 10)
+
+    is_speech = (
+        (energy > noise_floor + ENERGY_MARGINS[aggressiveness])
+        & (energy > ABSOLUTE_FLOOR_DB)
+        & (ratio > BAND_RATIOS[aggressiveness])
+        & (flatness < FLATNESS_LIMITS[aggressiveness])
+    )
+
+    # Fraction of speech frames in a window around each frame
+    smoothing = max(int(SMOOTHING / FRAME_LENGTH), 1)
+    density = np.convolve(
+        is_speech.astype(np.float32), np.ones(smoothing) / smoothing, mode="same"
+    )
+    is_speech = density > 0.3
+
+    # Edges of runs of speech frames
+    edges = np.diff(np.concatenate([[0], is_speech.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    pad = int(padding * SAMPLE_RATE)
+    min_length = int(MIN_SPEECH / FRAME_LENGTH)
+
+    regions = []
+    for start, end in zip(starts, ends):
+
+        if end - start < min_length:
+            continue
+
+        start = max(int(start) * frame_length - pad, 0)
+        end = min(int(end) * frame_length + pad, len(audio))
+
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+
+    return regions
+
+
+def compact(audio: np.ndarray, regions: list) -> tuple:
+    """
+    Join speech regions into one shorter buffer, separated by short silences.
+
+    Args:
+        audio (np.ndarray): Decoded PCM at `SAMPLE_RATE`
+        regions (list): (start, end) sample offsets from `speech_map`
+
+    Returns:
+        tuple: (compacted PCM, offset map for `restore_timestamps`)
+    """
+
+    gap = np.zeros(int(COMPACT_GAP * SAMPLE_RATE), dtype=audio.dtype)
+
+    pieces = []
+    offset_map = []
+    position = 0
+
+    for start, end in regions:
+
+        if pieces:
+            pieces.append(gap)
+            position += len(gap)
+
+        # (start in compacted audio, start in original audio, length), in seconds
+        offset_map.append(
+            (
+                position / SAMPLE_RATE,
+                start / SAMPLE_RATE,
+                (end - start) / SAMPLE_RATE,
+            )
+        )
+        pieces.append(audio[start:end])
+        position += end - start
+
+    if not pieces:
+        return np.zeros(0, dtype=audio.dtype), offset_map
+
+    return np.concatenate(pieces), offset_map
+
+
+def _restore(time: float, offset_map: list) -> float:
+    """Map a time in compacted audio back to the original"""
+
+    for compact_start, original_start, length in reversed(offset_map):
+
+        if time >= compact_start:
+            # Times in the gap after a region clamp to its end
+            return original_start + min(time - compact_start, length)
+
+    return offset_map[0][1] if offset_map else time
+
+
+def restore_timestamps(result: dict, offset_map: list) -> dict:
+    """
+    Map a transcription of compacted audio back to the original timing.
+
+    Args:
+        result (dict): Whisper style result for the compacted audio
+        offset_map (list): Offset map from `compact`
+
+    Returns:
+        dict: Whisper style result with original timestamps
+    """
+
+    segments = [
+        {
+            **seg,
+            "start": _restore(seg["start"], offset_map),
+            "end": _restore(seg["end"], offset_map),
+        }
+        for seg in result["segments"]
+    ]
+
+    return {**result, "segments": segments}
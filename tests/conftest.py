@@ -0,0 +1,44 @@
+import os
+import re
+import tempfile
+
+import pytest
+
+DEFAULT_SETTINGS_FILE = os.path.join(
+    os.path.dirname(__file__), "..", "squawk", "settings", "default_settings.yml"
+)
+
+
+def write_user_settings(home: str):
+    """Write default user settings under `home`, so nothing prompts"""
+
+    settings_dir = os.path.join(home, ".config", "squawk")
+    os.makedirs(settings_dir, exist_ok=True)
+
+    # The working directory has to exist to pass validation
+    with open(DEFAULT_SETTINGS_FILE, "r", encoding="utf-8") as file:
+        user_settings = re.sub(
+            r"working_dir: \S+",
+            f"working_dir: {home.replace(os.sep, '/')}",
+            file.read(),
+        )
+
+    user_file = os.path.join(settings_dir, "user_settings.yml")
+    with open(user_file, "w", encoding="utf-8") as file:
+        file.write(user_settings)
+
+    return user_file
+
+
+# Settings are loaded on import, so point them at defaults before any test imports squawk
+from squawk.settings import SettingsManager  # noqa: E402
+
+SettingsManager(user_settings_file=write_user_settings(tempfile.mkdtemp()))
+
+
+@pytest.fixture
+def home(tmp_path):
+    """A home directory with default user settings"""
+
+    write_user_settings(str(tmp_path))
+    return tmp_path
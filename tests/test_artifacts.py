@@ -0,0 +1,55 @@
+import time
+
+from squawk.app import artifacts
+
+
+def make_store(tmp_path, count: int = 3, **quotas) -> artifacts.ArtifactStore:
+    """A store with `count` 1 KB renders, last used a day ago"""
+
+    store = artifacts.ArtifactStore(str(tmp_path), **quotas)
+
+    for i in range(count):
+        path = tmp_path / f"render{i}.wav"
+        path.write_bytes(b"\0" * 1024)
+        store.register(str(path), "render")
+
+    with store._locked():
+        index = store._read_index()
+        for i, entry in enumerate(index.values()):
+            entry["last_used"] = time.time() - 24 * 3600 + i
+        store._write_index(index)
+
+    return store
+
+
+def test_configured_zero_quotas_mean_no_limit(tmp_path):
+
+    store = make_store(tmp_path, max_size_mb=0, max_age_days=0)
+
+    assert store.prune() == []
+    assert len(store.entries()) == 3
+
+
+def test_prune_to_zero_size_evicts_everything(tmp_path):
+
+    store = make_store(tmp_path)
+
+    assert len(store.prune(max_size_mb=0)) == 3
+    assert store.entries() == {}
+    assert not list(tmp_path.glob("*.wav"))
+
+
+def test_prune_keeps_recently_used(tmp_path):
+
+    store = make_store(tmp_path)
+    store.touch(str(tmp_path / "render0.wav"))
+
+    assert store.prune(everything=True) == ["render1.wav", "render2.wav"]
+
+
+def test_dry_run_evicts_nothing(tmp_path):
+
+    store = make_store(tmp_path)
+
+    assert len(store.prune(max_size_mb=0, dry_run=True)) == 3
+    assert len(store.entries()) == 3
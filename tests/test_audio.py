@@ -0,0 +1,80 @@
+import wave
+
+import numpy as np
+import pytest
+from squawk.utils import audio
+
+
+def write_wav(path, samples: np.ndarray, rate: int):
+    """Write int16 samples, shaped (frames, channels), as a PCM WAV"""
+
+    with wave.open(str(path), "wb") as file:
+        file.setnchannels(samples.shape[1])
+        file.setsampwidth(2)
+        file.setframerate(rate)
+        file.writeframes(samples.astype("<i2").tobytes())
+
+
+def reference(samples: np.ndarray, rate: int) -> np.ndarray:
+    """Downmix and decimate the whole file at once"""
+
+    mono = samples.mean(axis=1, dtype=np.float32) / 32768
+    factor = rate // audio.SAMPLE_RATE
+    if factor == 1:
+        return mono
+
+    taps = audio._lowpass_taps(factor)
+    half = len(taps) // 2
+    return np.convolve(np.pad(mono, half), taps, mode="valid")[::factor]
+
+
+@pytest.mark.parametrize(
+    "rate, channels, frames",
+    [
+        # Odd frame counts that aren't a multiple of the decimation factor,
+        # spanning several blocks with a partial last block
+        (48000, 2, 48000 * 2 + 7),
+        (32000, 1, 32000 * 3 - 1),
+        (16000, 2, 16000 + 3),
+        # Shorter than the filter
+        (48000, 2, 5),
+    ],
+)
+def test_load_wav_matches_whole_file_decimation(tmp_path, rate, channels, frames):
+
+    samples = np.random.default_rng(0).integers(
+        -20000, 20000, (frames, channels), dtype=np.int16
+    )
+    path = tmp_path / "audio.wav"
+    write_wav(path, samples, rate)
+
+    pcm = audio.load_wav(str(path))
+    expected = reference(samples, rate)
+
+    assert pcm.dtype == np.float32
+    assert len(pcm) == -(-frames // (rate // audio.SAMPLE_RATE))
+    np.testing.assert_allclose(pcm, expected, atol=1e-5)
+
+
+def test_wav_blocks_join_seamlessly(tmp_path):
+
+    samples = np.random.default_rng(1).integers(
+        -20000, 20000, (48000 * 3 + 1, 2), dtype=np.int16
+    )
+    path = tmp_path / "audio.wav"
+    write_wav(path, samples, 48000)
+
+    blocks = list(audio.iter_audio(str(path), block_seconds=1))
+
+    assert [len(x) for x in blocks] == [16000, 16000, 16000, 1]
+    np.testing.assert_allclose(
+        np.concatenate(blocks), audio.load_wav(str(path)), atol=1e-6
+    )
+
+
+def test_unsupported_rate_needs_ffmpeg(tmp_path):
+
+    path = tmp_path / "audio.wav"
+    write_wav(path, np.zeros((100, 1), dtype=np.int16), 44100)
+
+    assert audio.load_wav(str(path)) is None
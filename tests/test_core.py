@@ -0,0 +1,29 @@
+import os
+
+import pytest
+from squawk.utils import core
+
+
+def test_atomic_write_replaces_file(tmp_path):
+
+    path = tmp_path / "new" / "file.json"
+
+    with core.atomic_write(str(path)) as file:
+        file.write("written")
+
+    assert path.read_text(encoding="utf-8") == "written"
+    assert os.listdir(path.parent) == ["file.json"]
+
+
+def test_atomic_write_failure_leaves_file_alone(tmp_path):
+
+    path = tmp_path / "file.json"
+    path.write_text("original", encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        with core.atomic_write(str(path)) as file:
+            file.write("partial")
+            raise ValueError()
+
+    assert path.read_text(encoding="utf-8") == "original"
+    assert os.listdir(tmp_path) == ["file.json"]
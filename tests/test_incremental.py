@@ -0,0 +1,114 @@
+from squawk.app import incremental
+
+FPS = 25
+
+
+def clip(source: str, start: int, end: int, track: int = 1, in_point: int = 0) -> dict:
+    return {
+        "track": track,
+        "source": source,
+        "in": in_point,
+        "duration": end - start,
+        "start": start,
+        "end": end,
+    }
+
+
+def segment(start: float, end: float, text: str = "words") -> dict:
+    return {"start": start, "end": end, "text": text}
+
+
+def manifest(layout: list, segments: list) -> dict:
+    return {"start_frame": 0, "layout": layout, "segments": segments}
+
+
+# Two 10 second clips back to back
+OLD_LAYOUT = [clip("a", 0, 250), clip("b", 250, 500)]
+
+
+def test_merge_ranges():
+
+    assert incremental.merge_ranges([(5, 6), (0, 2), (1, 3)]) == [(0, 3), (5, 6)]
+    assert incremental.merge_ranges([(0, 2), (5, 6)], gap=3) == [(0, 6)]
+
+
+def test_subtract_ranges():
+
+    assert incremental.subtract_ranges([(0, 10)], [(2, 3), (5, 6)]) == [
+        (0, 2),
+        (3, 5),
+        (6, 10),
+    ]
+    assert incremental.subtract_ranges([(0, 10)], [(0, 10)]) == []
+    assert incremental.subtract_ranges([(0, 2), (4, 6)], [(1, 5)]) == [(0, 1), (5, 6)]
+
+
+def test_match_clips_pairs_moved_clips():
+
+    new = [clip("b", 0, 250), clip("a", 250, 500)]
+    assert incremental.match_clips(OLD_LAYOUT, new) == {0: (1, -250), 1: (0, 250)}
+
+
+def test_match_clips_ignores_trimmed_clips():
+
+    new = [clip("a", 0, 200), clip("b", 200, 450)]
+    assert incremental.match_clips(OLD_LAYOUT, new) == {1: (1, -50)}
+
+
+def test_identical_layout_keeps_everything():
+
+    segments = [segment(2, 4), segment(12, 14)]
+
+    kept, dirty = incremental.plan_update(
+        manifest(OLD_LAYOUT, segments), OLD_LAYOUT, FPS
+    )
+
+    assert kept == segments
+    assert dirty == []
+
+
+def test_inserted_clip_shifts_later_segments():
+
+    new = [clip("a", 0, 250), clip("c", 250, 375), clip("b", 375, 625)]
+
+    assert incremental.find_clean_ranges(OLD_LAYOUT, new) == [
+        (0, 250, 0),
+        (375, 625, 125),
+    ]
+
+    kept, dirty = incremental.plan_update(
+        manifest(OLD_LAYOUT, [segment(2, 4), segment(12, 14)]), new, FPS
+    )
+
+    assert kept == [segment(2, 4), segment(17, 19)]
+    assert dirty == [(10 - incremental.RANGE_PADDING, 15 + incremental.RANGE_PADDING)]
+
+
+def test_trimmed_clip_is_retranscribed():
+
+    new = [clip("a", 0, 200), clip("b", 200, 450)]
+
+    kept, dirty = incremental.plan_update(
+        manifest(OLD_LAYOUT, [segment(2, 4), segment(12, 14)]), new, FPS
+    )
+
+    # The trimmed clip's segment is dropped, the rippled one follows its clip
+    assert kept == [segment(10, 12)]
+    assert dirty == [(0, 8 + incremental.RANGE_PADDING)]
+
+
+def test_padding_spills_into_kept_segments():
+
+    new = [clip("a", 0, 250), clip("c", 250, 375), clip("b", 375, 625)]
+
+    # Once shifted, the first starts inside the padding after the inserted clip,
+    # and the second overlaps the first, so both are redone
+    segments = [segment(2, 4), segment(10.5, 11.2), segment(11.1, 12), segment(13, 14)]
+
+    kept, dirty = incremental.plan_update(manifest(OLD_LAYOUT, segments), new, FPS)
+
+    assert kept == [segment(2, 4), segment(18, 19)]
+    assert dirty == [(9, 17)]
+
+    for seg in kept:
+        assert all(seg["end"] <= start or seg["start"] >= end for start, end in dirty)
@@ -0,0 +1,60 @@
+import os
+import re
+import subprocess
+import sys
+
+
+# Seconds `import squawk.app.cli` may take, so `squawk --help` stays responsive
+IMPORT_BUDGET = 1.0
+
+# Only imported by the commands that need them
+HEAVY_MODULES = ["whisper", "torch", "pydavinci"]
+
+
+def _import(home, module: str = "squawk.app.cli") -> tuple:
+    """Import a module in a fresh interpreter, returning (stderr, heavy modules loaded)"""
+
+    check = (
+        f"import sys, {module}; "
+        f"print('loaded:' + ','.join(x for x in {HEAVY_MODULES!r} if x in sys.modules))"
+    )
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        capture_output=True,
+        text=True,
+        check=True,
+        stdin=subprocess.DEVNULL,
+        cwd=os.path.join(os.path.dirname(__file__), ".."),
+        env={**os.environ, "HOME": str(home), "USERPROFILE": str(home)},
+    )
+
+    # The settings spinner writes to stdout too
+    loaded = re.search(r"^loaded:(.*)$", process.stdout, re.M).group(1)
+    return process.stderr, [x for x in loaded.split(",") if x]
+
+
+def test_cli_import_skips_heavy_modules(home):
+
+    _, loaded = _import(home)
+    assert loaded == []
+
+
+def test_cli_import_within_budget(home):
+
+    # The first run validates settings, later runs start from the snapshot
+    _import(home)
+    stderr, _ = _import(home)
+
+    # "import time: self [us] | cumulative | imported package"
+    cumulative = re.search(r"\|\s*(\d+)\s*\|\s*squawk\.app\.cli\s*$", stderr, re.M)
+    assert cumulative, "squawk.app.cli not found in -X importtime output"
+
+    seconds = int(cumulative.group(1)) / 1e6
+    assert seconds < IMPORT_BUDGET, f"Importing the CLI took {seconds:.2f} seconds"
+
+
+def test_transcription_import_skips_whisper(home):
+
+    # Server clients and the mock engine never need whisper or torch
+    _, loaded = _import(home, "squawk.app.main")
+    assert loaded == []